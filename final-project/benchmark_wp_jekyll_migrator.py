@@ -0,0 +1,661 @@
+"""
+Benchmarks for WordPress to Jekyll Migrator.
+
+This module times the hot functions in wp_jekyll_migrator.py against
+synthetic data. Run it directly, for example:
+
+    python benchmark_wp_jekyll_migrator.py micro --count 1000000
+    python benchmark_wp_jekyll_migrator.py suite --sizes 10000,100000 --json results.json
+    python benchmark_wp_jekyll_migrator.py suite --compare results.json
+    python benchmark_wp_jekyll_migrator.py markdown --posts 500
+    python benchmark_wp_jekyll_migrator.py memory --size-mb 10
+
+The suite generates seeded WordPress-style CSV exports, times each stage
+of the pipeline and the end-to-end main() path, and can save the results
+as JSON so runs from different commits can be compared.
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import unicodedata
+from datetime import date, datetime, timedelta
+
+import wp_jekyll_migrator
+from wp_jekyll_migrator import (
+    ColumnMapping,
+    RunContext,
+    add_dropcaps,
+    convert_post_fragments,
+    format_post_date,
+    generate_frontmatter,
+    html_to_markdown,
+    iter_chunks,
+    parse_post_date,
+    process_post_row,
+    read_csv_file,
+    read_csv_parallel,
+    read_mapped_csv,
+    sanitize_slug,
+    write_markdown_file,
+)
+
+
+# Export sizes the suite runs by default
+SUITE_SIZES = (10_000, 100_000, 1_000_000)
+
+# Rows loaded into memory at a time when timing individual functions
+SUITE_BATCH_SIZE = 10_000
+
+# Times the pipeline slugs the title of a row without a Slug: once each in
+# SlugIndex, TaxonomyIndex and process_post_row
+SLUG_REPEATS = 3
+
+# Worker counts the parallel CSV reader is timed with
+READER_WORKERS = (1, 2, 4)
+
+# Reference date used for every suite run, so results are reproducible
+SUITE_AS_OF = "2025-06-01"
+
+# Columns of a synthetic WordPress export
+EXPORT_COLUMNS = ["id", "Date", "Title", "Excerpt", "Content", "Image Path", "Categories", "Slug"]
+
+# Columns the generator sometimes leaves empty, as real exports do
+OPTIONAL_COLUMNS = ["Excerpt", "Image Path", "Categories", "Slug"]
+
+# Sentences used to build synthetic HTML post bodies
+CONTENT_SENTENCES = [
+    "Web development is an essential skill in today's digital world.",
+    "Python offers many built-in functions that can simplify your code.",
+    "El corazón de la programación es resolver problemas con claridad.",
+    "Cascading Style Sheets (CSS) is the foundation of modern web design.",
+    "Databases are crucial for storing and managing data efficiently.",
+    "Los niños aprendieron a programar en español durante el año.",
+    "Don't underestimate the power of good styling—it transforms the user experience.",
+]
+
+
+# Size of the synthetic posts the markdown benchmark converts
+MARKDOWN_POST_BYTES = 100_000
+
+# Words used to build synthetic titles, including accents and punctuation
+TITLE_WORDS = [
+    "Python", "Tips", "Café", "Menu", "Naïveté", "Résumé", "Part 1:", "Getting",
+    "Started/Basics", "What?", "Really!", "(No way)", "The", "BEST:", "Tips &",
+    "Tricks!", "Año", "Niño", "Corazón", "\"Quoted\"", "It's", "C:\\Path", "<b>",
+    "a|b", "***", "Über", "Straße", "Déjà", "vu", "Web", "Development",
+]
+
+
+def legacy_sanitize_slug(title):
+    """
+    The original sanitize_slug implementation, kept to compare against.
+    Returns the same slug as sanitize_slug for every title.
+    """
+    normalized_title = unicodedata.normalize('NFKD', title)
+    ascii_title = normalized_title.encode('ascii', 'ignore').decode('utf-8')
+    replacements = {
+        ":": "-",
+        "/": "-",
+        "\\": "-",
+        "?": "",
+        "*": "",
+        "<": "",
+        ">": "",
+        "|": "",
+        "\"": "",
+        "'": "",
+    }
+    slug = ascii_title.lower().replace(" ", "-")
+    for invalid_char, valid_char in replacements.items():
+        slug = slug.replace(invalid_char, valid_char)
+    slug = re.sub(r"[^a-zA-Z0-9\-]", "", slug)
+    return slug
+
+
+def make_titles(count, seed=111):
+    """
+    Builds a list of count synthetic post titles.
+    The same seed always produces the same titles.
+    """
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(TITLE_WORDS, k=rng.randint(2, 8))) for _ in range(count)]
+
+
+def make_dates(count, seed=111, with_time=False):
+    """
+    Builds a list of count synthetic publication dates over ten years.
+    With with_time, dates use WordPress's "YYYY-MM-DD HH:MM:SS" format.
+    """
+    rng = random.Random(seed)
+    start = date(2015, 1, 1)
+    dates = []
+    for _ in range(count):
+        day = start + timedelta(days=rng.randrange(3650))
+        if with_time:
+            dates.append(f"{day.isoformat()} {rng.randrange(24):02d}:{rng.randrange(60):02d}:00")
+        else:
+            dates.append(day.isoformat())
+    return dates
+
+
+def legacy_parse_row_dates(pub_date, now=datetime(2025, 6, 1)):
+    """
+    The original per-row date work: one strptime for the filename and
+    another for the comments flag in generate_frontmatter.
+    """
+    date_text = datetime.strptime(pub_date, "%Y-%m-%d").strftime("%Y-%m-%d")
+    comments_open = (now - datetime.strptime(pub_date, "%Y-%m-%d")).days <= 90
+    return date_text, comments_open
+
+
+def make_posts(count, seed=111):
+    """
+    Builds a list of count synthetic post_data dictionaries.
+    Titles and excerpts include quotes, colons and other YAML indicators.
+    """
+    rng = random.Random(seed)
+    dates = make_dates(count, seed)
+    posts = []
+    for pub_date, title in zip(dates, make_titles(count, seed)):
+        posts.append({
+            "title": title,
+            "pub_date": pub_date,
+            "image": f"/assets/images/{rng.randrange(1000)}.jpg",
+            "excerpt": rng.choice(["A short excerpt.", "Note: it's \"quoted\"", "# not a comment", title]),
+            "slug": sanitize_slug(title),
+            "categories": rng.choice(["Tutorial", "Programming", "Web Design", "News: Local"]),
+        })
+    return posts
+
+
+def legacy_generate_frontmatter(post_data):
+    """
+    The original f-string frontmatter, which calls datetime.now() and
+    strptime() for every post and does not escape any values.
+    """
+    pub_date = post_data["pub_date"]
+    comments_status = "false" if (datetime.now() - datetime.strptime(pub_date, "%Y-%m-%d")).days > 90 else "true"
+    return f"""---
+layout: post
+title: "{post_data["title"]}"
+date: {pub_date}
+categories: {post_data["categories"]}
+image: {post_data["image"]}
+permalink: /{post_data["slug"]}/
+custom_excerpt: "{post_data["excerpt"]}"
+comments: {comments_status}
+---
+"""
+
+
+def fstring_generate_frontmatter(post_data, context):
+    """
+    The f-string frontmatter with the run context's comments cutoff, before
+    values were escaped. It produces invalid YAML for many titles and is
+    only kept as a lower bound for the escaping f-string.
+    """
+    pub_date = post_data["pub_date"]
+    comments_status = "true" if context.comments_open(pub_date) else "false"
+    return f"""---
+layout: post
+title: "{post_data["title"]}"
+date: {pub_date}
+categories: {post_data["categories"]}
+image: {post_data["image"]}
+permalink: /{post_data["slug"]}/
+custom_excerpt: "{post_data["excerpt"]}"
+comments: {comments_status}
+---
+"""
+
+
+def count_invalid_yaml(frontmatters):
+    """
+    Returns how many frontmatter strings PyYAML cannot load, or None when
+    PyYAML is not installed.
+    """
+    try:
+        import yaml
+    except ImportError:
+        return None
+    invalid_count = 0
+    for frontmatter in frontmatters:
+        try:
+            yaml.safe_load(frontmatter.strip().strip("-"))
+        except yaml.YAMLError:
+            invalid_count += 1
+    return invalid_count
+
+
+def time_function(function, values):
+    """
+    Calls function once for every value.
+    Returns a tuple of (elapsed seconds, list of results).
+    """
+    start = time.perf_counter()
+    results = [function(value) for value in values]
+    return time.perf_counter() - start, results
+
+
+def benchmark_sanitize_slug(count):
+    """
+    Times the legacy and current sanitize_slug on count synthetic titles,
+    both with every title slugged once and with each title slugged
+    SLUG_REPEATS times in a row, the way the pipeline slugs a row without
+    a Slug. The first shows the cost of the cache on unique titles, the
+    second what it saves.
+    Returns a dictionary of slugs per second for each variant.
+    """
+    titles = make_titles(count)
+    repeated_titles = [title for title in titles for _ in range(SLUG_REPEATS)]
+
+    legacy_time, legacy_slugs = time_function(legacy_sanitize_slug, titles)
+    uncached_time, uncached_slugs = time_function(sanitize_slug.__wrapped__, titles)
+    sanitize_slug.cache_clear()
+    cached_time, cached_slugs = time_function(sanitize_slug, titles)
+    repeated_uncached_time, _ = time_function(sanitize_slug.__wrapped__, repeated_titles)
+    sanitize_slug.cache_clear()
+    repeated_cached_time, _ = time_function(sanitize_slug, repeated_titles)
+
+    if not legacy_slugs == uncached_slugs == cached_slugs:
+        raise AssertionError("sanitize_slug output differs from the legacy implementation")
+
+    return {
+        "legacy": count / legacy_time,
+        "translate": count / uncached_time,
+        "translate + lru_cache": count / cached_time,
+        f"x{SLUG_REPEATS}: translate": len(repeated_titles) / repeated_uncached_time,
+        f"x{SLUG_REPEATS}: + lru_cache": len(repeated_titles) / repeated_cached_time,
+    }
+
+
+def benchmark_date_parsing(count):
+    """
+    Times the per-row date work for count synthetic rows.
+    Returns a dictionary of rows per second for each variant.
+    """
+    dates = make_dates(count)
+    wordpress_dates = make_dates(count, with_time=True)
+    context = RunContext(datetime(2025, 6, 1))
+
+    def current_row_dates(pub_date):
+        return format_post_date(pub_date), context.comments_open(pub_date)
+
+    def uncached_row_dates(pub_date):
+        date_text = parse_post_date(pub_date).strftime("%Y-%m-%d")
+        return date_text, date_text >= context.comments_cutoff
+
+    legacy_time, legacy_results = time_function(legacy_parse_row_dates, dates)
+    uncached_time, uncached_results = time_function(uncached_row_dates, dates)
+    format_post_date.cache_clear()
+    cached_time, cached_results = time_function(current_row_dates, dates)
+    format_post_date.cache_clear()
+    wordpress_time, _ = time_function(current_row_dates, wordpress_dates)
+
+    if not legacy_results == uncached_results == cached_results:
+        raise AssertionError("date parsing differs from the legacy implementation")
+
+    return {
+        "legacy strptime x2": count / legacy_time,
+        "fromisoformat": count / uncached_time,
+        "fromisoformat + cache": count / cached_time,
+        "YYYY-MM-DD HH:MM:SS": count / wordpress_time,
+    }
+
+
+def benchmark_frontmatter(count):
+    """
+    Times the legacy f-string, the unescaped context f-string and the
+    escaping f-string of generate_frontmatter on count synthetic posts,
+    and checks which produce valid YAML.
+    Returns a dictionary of posts per second for each variant.
+    """
+    posts = make_posts(count)
+    context = RunContext(datetime(2025, 6, 1))
+
+    legacy_time, _ = time_function(legacy_generate_frontmatter, posts)
+    fstring_time, fstring_results = time_function(lambda post: fstring_generate_frontmatter(post, context), posts)
+    escaping_time, escaping_results = time_function(lambda post: generate_frontmatter(post, context), posts)
+
+    # Validating YAML is slow, so only a sample is checked
+    sample_size = min(count, 10_000)
+    for name, results in (("context f-string", fstring_results), ("escaping f-string", escaping_results)):
+        invalid_count = count_invalid_yaml(results[:sample_size])
+        if invalid_count is not None:
+            print(f"  {name}: {invalid_count:,} of {sample_size:,} sampled frontmatters are invalid YAML")
+
+    return {
+        "legacy f-string": count / legacy_time,
+        "context f-string": count / fstring_time,
+        "escaping f-string": count / escaping_time,
+    }
+
+
+def make_content(rng, paragraphs):
+    """
+    Builds a synthetic HTML post body with the given number of paragraphs.
+    Paragraphs mix plain text, links, emphasis and images.
+    """
+    parts = []
+    for index in range(paragraphs):
+        sentences = " ".join(rng.choices(CONTENT_SENTENCES, k=rng.randint(3, 8)))
+        if index % 4 == 1:
+            sentences += ' See <a href="https://example.com/more">more</a>.'
+        elif index % 4 == 2:
+            sentences = f"<strong>Note:</strong> {sentences}"
+        elif index % 4 == 3:
+            parts.append(f'<img src="https://example.com/images/{rng.randrange(5000)}.jpg" alt="" />')
+        parts.append(f"<p>{sentences}</p>")
+    return "\n".join(parts)
+
+
+def legacy_convert_and_write(row, context, output_folder):
+    """
+    The string pipeline before posts were written as fragments: strip the
+    body twice for dropcaps, concatenate the file, then write it whole.
+    """
+    post_data = process_post_row(row, context=context)
+    content_text = post_data.content
+    if content_text.strip():
+        content_text = re.sub(r"^(\w)", r'<span class="dropcaps">\1</span>', content_text.strip(), count=1)
+    md_content = generate_frontmatter(post_data, context) + "\n" + content_text + "\n"
+    filename = f"{post_data.date}-{post_data.slug}.md"
+    with open(os.path.join(output_folder, filename), "w", encoding="utf-8") as md_file:
+        md_file.write(md_content)
+
+
+def fragments_convert_and_write(row, context, output_folder):
+    """
+    The current pipeline: convert a post into fragments and write them.
+    """
+    filename, md_fragments = convert_post_fragments(row, context=context)
+    write_markdown_file(output_folder, filename, md_fragments)
+
+
+def benchmark_memory(size_mb):
+    """
+    Measures the peak memory allocated while converting and writing one
+    post with a body of size_mb megabytes, with tracemalloc.
+    Returns a dictionary of peak allocations, in multiples of the body
+    size, for the legacy and current pipelines.
+    """
+    context = RunContext(datetime.strptime(SUITE_AS_OF, "%Y-%m-%d"))
+    sentence = "Markdown bodies can be large. "
+    body = sentence * (size_mb * 1_000_000 // len(sentence))
+    row = {"Title": "Large post", "Date": "2025-01-01", "Content": body}
+    body_bytes = len(body.encode("utf-8"))
+    peaks = {}
+    with tempfile.TemporaryDirectory() as output_folder:
+        for name, function in (("legacy string", legacy_convert_and_write),
+                               ("fragments", fragments_convert_and_write)):
+            tracemalloc.start()
+            function(row, context, output_folder)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            peaks[name] = peak / body_bytes
+    return peaks
+
+
+def make_long_content(rng, size):
+    """
+    Builds a synthetic HTML post body of at least size characters, mixing
+    paragraphs with headings, lists and code blocks.
+    """
+    parts = []
+    length = 0
+    while length < size:
+        section = len(parts)
+        parts.append(f"<h2>Section {section}</h2>")
+        parts.append(make_content(rng, rng.randint(4, 10)))
+        items = "".join(f"<li>{rng.choice(CONTENT_SENTENCES)}</li>" for _ in range(rng.randint(2, 6)))
+        parts.append(f"<ul>{items}</ul>")
+        parts.append(f"<pre><code>\nfor item in range({section}):\n    print(item &lt; {section})\n</code></pre>")
+        length += sum(len(part) for part in parts[-4:])
+    return "\n".join(parts)
+
+
+def benchmark_markdown(count, size=MARKDOWN_POST_BYTES, seed=111):
+    """
+    Times html_to_markdown on count synthetic posts of about size characters.
+    Returns a dictionary with posts per second and megabytes per second.
+    """
+    rng = random.Random(seed)
+    posts = [make_long_content(rng, size) for _ in range(min(count, 20))]
+    posts = [posts[index % len(posts)] for index in range(count)]
+    elapsed, _ = time_function(html_to_markdown, posts)
+    megabytes = sum(len(post.encode("utf-8")) for post in posts) / 1_000_000
+    return {"posts": count / elapsed, "MB": megabytes / elapsed}
+
+
+def generate_export(csv_path, rows, seed=111, max_paragraphs=12):
+    """
+    Writes a seeded synthetic WordPress export with the given number of rows.
+    Rows have long HTML content, unicode titles, WordPress and ISO dates,
+    and empty optional columns. The same seed always writes the same file.
+    """
+    rng = random.Random(seed)
+    start = date(2015, 1, 1)
+    with open(csv_path, "w", encoding="utf-8", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(EXPORT_COLUMNS)
+        for post_id in range(1, rows + 1):
+            title = " ".join(rng.choices(TITLE_WORDS, k=rng.randint(2, 8)))
+            day = start + timedelta(days=rng.randrange(3650))
+            pub_date = day.isoformat()
+            if rng.random() < 0.5:
+                pub_date += f" {rng.randrange(24):02d}:{rng.randrange(60):02d}:00"
+            row = {
+                "id": post_id,
+                "Date": pub_date,
+                "Title": title,
+                "Excerpt": f"An excerpt about {title.lower()}.",
+                "Content": make_content(rng, rng.randint(1, max_paragraphs)),
+                "Image Path": f"https://example.com/images/{post_id}.jpg",
+                "Categories": rng.choice(["Tutorial", "Programming", "Web Design", "Noticias", "News: Local"]),
+                "Slug": f"{sanitize_slug(title)}-{post_id}",
+            }
+            for column in OPTIONAL_COLUMNS:
+                if rng.random() < 0.1:
+                    row[column] = ""
+            writer.writerow([row[column] for column in EXPORT_COLUMNS])
+
+
+def benchmark_stages(csv_path, context):
+    """
+    Times sanitize_slug, process_post_row, html_to_markdown, add_dropcaps
+    and generate_frontmatter over every row of an export, a batch at a time.
+    Returns a dictionary of calls per second for each function.
+    """
+    totals = {"sanitize_slug": 0.0, "process_post_row": 0.0, "html_to_markdown": 0.0, "add_dropcaps": 0.0,
+              "generate_frontmatter": 0.0}
+    row_count = 0
+    for rows in iter_chunks(read_csv_file(csv_path), SUITE_BATCH_SIZE):
+        row_count += len(rows)
+        sanitize_slug.cache_clear()
+        elapsed, _ = time_function(sanitize_slug, [row["Title"] for row in rows])
+        totals["sanitize_slug"] += elapsed
+        elapsed, posts = time_function(lambda row: process_post_row(row, context=context), rows)
+        totals["process_post_row"] += elapsed
+        elapsed, _ = time_function(html_to_markdown, [post.content for post in posts])
+        totals["html_to_markdown"] += elapsed
+        elapsed, _ = time_function(add_dropcaps, [post.content for post in posts])
+        totals["add_dropcaps"] += elapsed
+        elapsed, _ = time_function(lambda post: generate_frontmatter(post, context), posts)
+        totals["generate_frontmatter"] += elapsed
+    return {name: row_count / total for name, total in totals.items()}
+
+
+def benchmark_readers(csv_path):
+    """
+    Times reading every row of an export as DictReader dictionaries, as
+    ExportRows through the default column mapping, and as ExportRows from
+    the parallel reader with each of READER_WORKERS processes.
+    Returns a dictionary of rows per second for each reader.
+    """
+    readers = {"read_csv_file": read_csv_file, "read_mapped_csv": read_mapped_csv}
+    for workers in READER_WORKERS:
+        readers[f"read_csv_parallel x{workers}"] = (
+            lambda path, workers=workers: read_csv_parallel(path, workers, mapping=ColumnMapping()))
+    rates = {}
+    for name, reader in readers.items():
+        start = time.perf_counter()
+        row_count = sum(1 for _ in reader(csv_path))
+        rates[name] = row_count / (time.perf_counter() - start)
+    return rates
+
+
+def benchmark_end_to_end(csv_path, extra_args=()):
+    """
+    Times a full main() run over an export into a temporary folder.
+    Returns the number of posts per second.
+    """
+    row_count = sum(1 for _ in read_csv_file(csv_path))
+    with tempfile.TemporaryDirectory() as output_folder:
+        argv = ["--input", csv_path, "--output", os.path.join(output_folder, "posts"),
+                "--as-of", SUITE_AS_OF, *extra_args]
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            wp_jekyll_migrator.main(argv)
+        elapsed = time.perf_counter() - start
+    return row_count / elapsed
+
+
+def current_commit():
+    """
+    Returns the git commit the benchmark is running on, or None.
+    """
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def run_suite(sizes, seed=111):
+    """
+    Generates an export of each size and runs every suite benchmark on it.
+    Returns the results as a dictionary that can be saved as JSON.
+    """
+    context = RunContext(datetime.strptime(SUITE_AS_OF, "%Y-%m-%d"))
+    results = {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "seed": seed,
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory() as export_folder:
+        for size in sizes:
+            csv_path = os.path.join(export_folder, f"export-{size}.csv")
+            generate_export(csv_path, size, seed)
+            rates = benchmark_readers(csv_path)
+            rates.update(benchmark_stages(csv_path, context))
+            rates["main"] = benchmark_end_to_end(csv_path)
+            rates["main --dry-run"] = benchmark_end_to_end(csv_path, ["--dry-run"])
+            rates["main --async-posts 64"] = benchmark_end_to_end(csv_path, ["--async-posts", "64"])
+            os.remove(csv_path)
+            results["sizes"][str(size)] = rates
+            print_rates(f"suite ({size:,} rows)", rates, "rows")
+    return results
+
+
+def compare_results(previous, current):
+    """
+    Prints the change in throughput between two suite results.
+    Positive percentages are faster than the previous run.
+    """
+    print(f"Compared with {previous.get('commit') or 'previous run'}:")
+    for size, rates in current["sizes"].items():
+        previous_rates = previous["sizes"].get(size)
+        if previous_rates is None:
+            continue
+        print(f"  {int(size):,} rows")
+        for name, rate in rates.items():
+            if name in previous_rates:
+                change = (rate / previous_rates[name] - 1) * 100
+                print(f"    {name:<22} {change:>+8.1f}%")
+
+
+def print_rates(name, rates, unit):
+    """
+    Prints a small table of throughput numbers for one benchmark.
+    """
+    print(name)
+    for variant, rate in rates.items():
+        print(f"  {variant:<24} {rate:>14,.0f} {unit}/sec")
+
+
+def parse_sizes(value):
+    """
+    Parses a comma-separated list of export sizes such as "10000,100000".
+    """
+    try:
+        return [int(size) for size in value.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid sizes '{value}', expected numbers separated by commas")
+
+
+def main():
+    """
+    Runs the benchmarks and prints the results.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the WordPress to Jekyll migrator.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    micro = commands.add_parser("micro", help="time individual functions on synthetic values")
+    micro.add_argument("--count", type=int, default=1_000_000,
+                       help="number of synthetic titles and rows to use (default: 1000000)")
+    suite = commands.add_parser("suite", help="time the pipeline on generated exports")
+    suite.add_argument("--sizes", type=parse_sizes, default=list(SUITE_SIZES),
+                       help="comma-separated export sizes (default: 10000,100000,1000000)")
+    suite.add_argument("--seed", type=int, default=111, help="seed for the generated exports (default: 111)")
+    suite.add_argument("--json", help="save the results to this JSON file")
+    suite.add_argument("--compare", help="compare the results with a JSON file from an earlier run")
+    markdown = commands.add_parser("markdown", help="time html_to_markdown on large synthetic posts")
+    markdown.add_argument("--posts", type=int, default=500, help="number of posts to convert (default: 500)")
+    markdown.add_argument("--size", type=int, default=MARKDOWN_POST_BYTES,
+                          help=f"approximate size of each post in characters (default: {MARKDOWN_POST_BYTES})")
+    memory = commands.add_parser("memory", help="measure peak memory for writing one large post")
+    memory.add_argument("--size-mb", type=int, default=10, help="size of the post body in MB (default: 10)")
+    args = parser.parse_args()
+
+    if args.command == "micro":
+        print_rates(f"sanitize_slug ({args.count:,} titles)", benchmark_sanitize_slug(args.count), "slugs")
+        print_rates(f"date parsing ({args.count:,} rows)", benchmark_date_parsing(args.count), "rows")
+        print_rates(f"generate_frontmatter ({args.count:,} posts)", benchmark_frontmatter(args.count), "posts")
+        return
+    if args.command == "markdown":
+        rates = benchmark_markdown(args.posts, args.size)
+        print(f"html_to_markdown ({args.posts:,} posts of {args.size:,} characters)")
+        print(f"  {'posts':<24} {rates['posts']:>14,.0f} posts/sec")
+        print(f"  {'throughput':<24} {rates['MB']:>14,.1f} MB/sec")
+        return
+
+    if args.command == "memory":
+        print(f"peak memory while writing a {args.size_mb} MB post")
+        for name, peak in benchmark_memory(args.size_mb).items():
+            print(f"  {name:<24} {peak:>14.2f} x body size")
+        return
+
+    results = run_suite(args.sizes, args.seed)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as json_file:
+            compare_results(json.load(json_file), results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as json_file:
+            json.dump(results, json_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,12 +7,61 @@ edge cases.
 """
 
 import pytest
+import json
+import tarfile
+import zipfile
+from collections import Counter
+from datetime import date, datetime
 from wp_jekyll_migrator import (
     sanitize_slug,
     add_dropcaps,
     generate_frontmatter,
     format_markdown_file,
-    process_post_row
+    process_post_row,
+    read_csv_file,
+    convert_post,
+    iter_chunks,
+    migrate_rows,
+    main,
+    hash_row,
+    MANIFEST_FILENAME,
+    BufferedMarkdownWriter,
+    ArchiveWriter,
+    RunContext,
+    parse_post_date,
+    format_post_date,
+    StageTimer,
+    convert_post_timed,
+    PIPELINE_STAGES,
+    SlugIndex,
+    read_wxr_file,
+    read_posts,
+    find_csv_chunks,
+    read_csv_parallel,
+    rewrite_asset_urls,
+    AssetCopier,
+    html_to_markdown,
+    Checkpoint,
+    CHECKPOINT_FILENAME,
+    MANIFEST_FILENAME,
+    swap_output_folder,
+    rollback_output_folder,
+    split_terms,
+    TaxonomyIndex,
+    migrate_rows_async,
+    iter_async,
+    parse_args,
+    convert_post_fragments,
+    dropcaps_fragments,
+    markdown_fragments,
+    iter_text,
+    join_fragments,
+    write_markdown_file,
+    MARKDOWN_WRITE_CHUNK,
+    ColumnMapping,
+    ExportRow,
+    read_mapped_csv,
+    Post
 )
 
 
@@ -152,6 +201,18 @@ def test_sanitize_slug_mixed_case_special():
     assert result == result.lower()
 
 
+def test_sanitize_slug_backslash_and_symbols():
+    """Test that backslashes become hyphens and symbols are dropped."""
+    # Arrange
+    title = 'C:\\Temp "<Files>" | *Notes*'
+    
+    # Act
+    result = sanitize_slug(title)
+    
+    # Assert
+    assert result == "c--temp-files--notes"
+
+
 # ============================================================================
 # Tests for add_dropcaps() function
 # ============================================================================
@@ -248,6 +309,58 @@ def test_add_dropcaps_preserves_rest():
     assert result == expected
 
 
+def test_add_dropcaps_skips_leading_tags():
+    """Test that the first letter after leading HTML tags gets the dropcap."""
+    # Arrange
+    content = '\n  <div class="post">\n<p><em>Hello</em> world</p>\n'
+    
+    # Act
+    result = add_dropcaps(content)
+    
+    # Assert
+    assert result == '<div class="post">\n<p><em><span class="dropcaps">H</span>ello</em> world</p>'
+
+
+def test_add_dropcaps_no_letter_after_tags():
+    """Test that content not starting with a letter is only stripped."""
+    # Arrange
+    content = '  <img src="/a.jpg"> "Quoted" text  '
+    
+    # Act
+    result = add_dropcaps(content)
+    
+    # Assert
+    assert result == '<img src="/a.jpg"> "Quoted" text'
+
+
+@pytest.mark.parametrize("content", [
+    "<script>var a = 1;</script>Hi",
+    "<STYLE>p { color: red; }</STYLE><p>Hi</p>",
+    "<p><pre><code>x = 1\n</code></pre>",
+    "<code>print()</code> runs it",
+])
+def test_add_dropcaps_stops_at_code_tags(content):
+    """Test that no dropcap is added inside scripts, styles or code."""
+    # Act
+    result = add_dropcaps(content)
+    
+    # Assert
+    assert result == content.strip()
+
+
+def test_add_dropcaps_large_content():
+    """Test that a multi-megabyte post only changes its first letter."""
+    # Arrange
+    body = "word " * 1_000_000
+    content = f"<p>{body}</p>\n\n"
+    
+    # Act
+    result = add_dropcaps(content)
+    
+    # Assert
+    assert result == f'<p><span class="dropcaps">w</span>{body[1:]}</p>'
+
+
 # ============================================================================
 # Tests for generate_frontmatter() function
 # ============================================================================
@@ -273,7 +386,8 @@ def test_generate_frontmatter_format():
     assert "layout: post" in result
     assert 'title: "Test Post"' in result
     assert "date: 2025-02-18" in result
-    assert "categories: Tutorial" in result
+    assert "categories: [Tutorial]" in result
+    assert "tags: []" in result
     assert "image: /assets/images/test.jpg" in result
     assert "permalink: /test-post/" in result
     assert 'custom_excerpt: "A test excerpt"' in result
@@ -317,7 +431,166 @@ def test_generate_frontmatter_escapes_quotes():
     result = generate_frontmatter(post_data)
     
     # Assert
-    assert 'title: "Hello "World""' in result
+    assert 'title: "Hello \\"World\\""' in result
+
+
+def test_generate_frontmatter_adversarial_values():
+    """Test that colons, newlines and YAML words are quoted safely."""
+    # Arrange
+    post_data = {
+        "title": "Part 1: The \\ Backslash",
+        "pub_date": "2025-02-18 09:30:00",
+        "image": "/assets/images/test.jpg",
+        "excerpt": "Line one\nLine two",
+        "slug": "part-1",
+        "categories": "News: Local"
+    }
+    
+    # Act
+    result = generate_frontmatter(post_data)
+    
+    # Assert
+    assert 'title: "Part 1: The \\\\ Backslash"' in result
+    assert "date: 2025-02-18 09:30:00" in result
+    assert 'custom_excerpt: "Line one\\nLine two"' in result
+    assert 'categories: ["News: Local"]' in result
+    assert "permalink: /part-1/" in result
+
+
+def test_generate_frontmatter_is_valid_yaml():
+    """Test that adversarial titles and excerpts still parse as YAML."""
+    # Arrange
+    yaml = pytest.importorskip("yaml")
+    post_data = {
+        "title": 'He said: "hi" # not a comment',
+        "pub_date": "2025-02-18",
+        "image": "/assets/images/test.jpg",
+        "excerpt": "- looks like a list\n  key: value",
+        "slug": "odd-slug",
+        "categories": "true"
+    }
+    
+    # Act
+    result = generate_frontmatter(post_data)
+    parsed = yaml.safe_load(result.strip().strip("-"))
+    
+    # Assert
+    assert parsed["title"] == post_data["title"]
+    assert parsed["custom_excerpt"] == post_data["excerpt"]
+    assert parsed["categories"] == ["true"]
+    assert parsed["permalink"] == "/odd-slug/"
+
+
+def test_generate_frontmatter_category_and_tag_lists():
+    """Test that categories and tags are YAML lists split like the archive pages."""
+    # Arrange
+    yaml = pytest.importorskip("yaml")
+    row = {"Title": "Test", "Date": "2025-02-18", "Categories": "Web Design, News: Local,, Web Design",
+           "Tags": "python, csv"}
+    
+    # Act
+    result = generate_frontmatter(process_post_row(row))
+    parsed = yaml.safe_load(result.strip().strip("-"))
+    
+    # Assert
+    assert 'categories: [Web Design, "News: Local"]' in result
+    assert parsed["categories"] == list(split_terms(row["Categories"]))
+    assert parsed["tags"] == ["python", "csv"]
+
+
+def test_generate_frontmatter_escapes_line_breaks():
+    """Test that NEL and Unicode line separators load back unchanged."""
+    # Arrange
+    yaml = pytest.importorskip("yaml")
+    post_data = {
+        "title": "a\x85b",
+        "pub_date": "2025-02-18",
+        "image": "/assets/images/test.jpg",
+        "excerpt": "one\u2028two\u2029three",
+        "slug": "breaks",
+        "categories": "Test"
+    }
+    
+    # Act
+    result = generate_frontmatter(post_data)
+    parsed = yaml.safe_load(result.strip().strip("-"))
+    
+    # Assert
+    assert 'title: "a\\u0085b"' in result
+    assert parsed["title"] == post_data["title"]
+    assert parsed["custom_excerpt"] == post_data["excerpt"]
+
+
+def test_generate_frontmatter_comments_cutoff():
+    """Test that comments close for posts older than 90 days."""
+    # Arrange
+    context = RunContext(datetime(2025, 5, 19, 15, 30))
+    post_data = {
+        "title": "Test",
+        "pub_date": "2025-02-18",
+        "image": "/img.jpg",
+        "excerpt": "Test",
+        "slug": "test",
+        "categories": "Test"
+    }
+    
+    # Act
+    on_cutoff = generate_frontmatter(post_data, context)
+    post_data["pub_date"] = "2025-02-17"
+    past_cutoff = generate_frontmatter(post_data, context)
+    
+    # Assert
+    assert context.comments_cutoff == "2025-02-18"
+    assert "comments: true" in on_cutoff
+    assert "comments: false" in past_cutoff
+
+
+def test_main_as_of_is_reproducible(tmp_path):
+    """Test that --as-of fixes the comments flag for the whole run."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    write_export(csv_file, [("Post", "Content", "post")])
+    output_folder = tmp_path / "posts"
+    
+    # Act
+    main(["--input", str(csv_file), "--output", str(output_folder), "--as-of", "2025-03-01"])
+    
+    # Assert
+    assert "comments: true" in (output_folder / "2025-02-18-post.md").read_text(encoding="utf-8")
+
+
+# ============================================================================
+# Tests for date parsing
+# ============================================================================
+
+def test_parse_post_date_formats():
+    """Test the ISO fast path and the fallback formats."""
+    # Act / Assert
+    assert parse_post_date("2025-02-18") == date(2025, 2, 18)
+    assert parse_post_date("2025-02-18 23:59:59") == date(2025, 2, 18)
+    assert parse_post_date("2025/02/18") == date(2025, 2, 18)
+    assert parse_post_date("02/18/2025 10:00:00") == date(2025, 2, 18)
+
+
+def test_parse_post_date_invalid():
+    """Test that unknown date formats raise ValueError."""
+    # Act / Assert
+    with pytest.raises(ValueError):
+        parse_post_date("18 February 2025")
+
+
+def test_format_post_date_is_cached():
+    """Test that repeated dates are served from the cache."""
+    # Arrange
+    format_post_date.cache_clear()
+    
+    # Act
+    first = format_post_date("2025-02-18 10:00:00")
+    second = format_post_date("2025-02-18 10:00:00")
+    
+    # Assert
+    assert first == second == "2025-02-18"
+    assert format_post_date.cache_info().hits == 1
 
 
 # ============================================================================
@@ -462,6 +735,110 @@ def test_process_post_row_image_path_transformation():
     assert "https://example.com" not in result["image"]
 
 
+def test_process_post_row_wordpress_datetime():
+    """Test that WordPress dates with a time of day are accepted."""
+    # Arrange
+    row = {
+        "Title": "Test",
+        "Date": "2025-02-18 09:30:00",
+        "Content": "Content"
+    }
+    
+    # Act
+    result = process_post_row(row)
+    
+    # Assert
+    assert result["date"] == "2025-02-18"
+    assert result["pub_date"] == "2025-02-18 09:30:00"
+
+
+def test_process_post_row_missing_date_uses_context():
+    """Test that a missing date falls back to the run's reference time."""
+    # Arrange
+    row = {"Title": "Test", "Content": "Content"}
+    context = RunContext(datetime(2025, 3, 1, 8, 0, 0))
+    
+    # Act
+    result = process_post_row(row, context=context)
+    
+    # Assert
+    assert result["pub_date"] == "2025-03-01 08:00:00"
+    assert result["date"] == "2025-03-01"
+
+
+def test_process_post_row_empty_columns_use_defaults():
+    """Test that empty columns fall back to their defaults."""
+    # Arrange
+    row = {
+        "Title": "Test Post",
+        "Date": "2025-02-18",
+        "Content": "Content",
+        "Slug": "",
+        "Image Path": "",
+        "Categories": ""
+    }
+    
+    # Act
+    result = process_post_row(row)
+    
+    # Assert
+    assert result["slug"] == "test-post"
+    assert result["image"] == "/assets/images/default.jpg"
+    assert result["categories"] == "Uncategorized"
+
+
+def test_process_post_row_counts_fallbacks():
+    """Test that each fallback that fires is counted per column."""
+    # Arrange
+    rows = [
+        {"Title": "One", "Date": "2025-02-18", "Content": "Content", "Slug": "one"},
+        {"Title": "Two", "Date": "2025-02-18", "Content": "Content"},
+    ]
+    fallback_counts = Counter()
+    
+    # Act
+    for row in rows:
+        process_post_row(row, fallback_counts)
+    
+    # Assert
+    assert fallback_counts["Slug"] == 1
+    assert fallback_counts["Excerpt"] == 2
+    assert fallback_counts["Title"] == 0
+
+
+# ============================================================================
+# Tests for read_csv_file() function
+# ============================================================================
+
+def test_read_csv_file_streams_rows(tmp_path):
+    """Test that rows are yielded lazily one at a time."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    csv_file.write_text("Title,Date\nFirst,2025-01-01\nSecond,2025-01-02\n", encoding="utf-8")
+    
+    # Act
+    rows = read_csv_file(str(csv_file))
+    first = next(rows)
+    
+    # Assert
+    assert not isinstance(rows, list)
+    assert first["Title"] == "First"
+    assert next(rows)["Title"] == "Second"
+
+
+def test_read_csv_file_missing_file(tmp_path, capsys):
+    """Test that a missing CSV yields nothing and reports an error."""
+    # Arrange
+    csv_file = tmp_path / "missing.csv"
+    
+    # Act
+    rows = list(read_csv_file(str(csv_file)))
+    
+    # Assert
+    assert rows == []
+    assert "not found" in capsys.readouterr().out
+
+
 # ============================================================================
 # Integration Tests
 # ============================================================================
@@ -516,5 +893,1410 @@ def test_integration_complete_markdown_generation():
     assert '<span class="dropcaps">W</span>eb development is fun' in markdown
 
 
+def test_integration_convert_post():
+    """Test that convert_post builds the filename and full markdown."""
+    # Arrange
+    row = {
+        "Title": "Hello World",
+        "Date": "2025-02-18",
+        "Content": "Web development is fun",
+        "Slug": "hello-world"
+    }
+    
+    # Act
+    filename, markdown = convert_post(row)
+    
+    # Assert
+    assert filename == "2025-02-18-hello-world.md"
+    assert markdown.startswith("---\n")
+    assert '<span class="dropcaps">W</span>eb development is fun' in markdown
+
+
+# ============================================================================
+# Tests for parallel migration
+# ============================================================================
+
+def test_iter_chunks_sizes():
+    """Test that rows are grouped into chunks of the requested size."""
+    # Arrange
+    rows = iter(range(7))
+    
+    # Act
+    chunks = list(iter_chunks(rows, 3))
+    
+    # Assert
+    assert chunks == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_migrate_rows_workers_keep_order(tmp_path):
+    """Test that the process pool reports results in input order."""
+    # Arrange
+    rows = [
+        {"Title": f"Post {i}", "Date": "2025-02-18", "Content": "Content", "Slug": f"post-{i}"}
+        for i in range(10)
+    ]
+    
+    # Act
+    results = list(migrate_rows(rows, str(tmp_path), workers=2, chunk_size=3))
+    
+    # Assert
+    assert [filename for filename, written in results] == [
+        f"2025-02-18-post-{i}.md" for i in range(10)
+    ]
+    assert all(written for filename, written in results)
+    assert len(list(tmp_path.iterdir())) == 10
+
+
+def test_main_workers_summary(tmp_path, capsys):
+    """Test that the summary count is the same with and without workers."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    lines = ["Title,Date,Content,Slug"]
+    lines += [f"Post {i},2025-02-18,Content,post-{i}" for i in range(25)]
+    csv_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    output_folder = tmp_path / "posts"
+    
+    # Act
+    main(["--input", str(csv_file), "--output", str(output_folder), "--workers", "3", "--chunk-size", "4"])
+    
+    # Assert
+    assert "Successfully processed 25 posts." in capsys.readouterr().out
+    assert len(list(output_folder.glob("*.md"))) == 25
+
+
+@pytest.mark.parametrize("argv", [["--chunk-size", "0"], ["--chunk-size", "-1"], ["--asset-threads", "0"]])
+def test_parse_args_rejects_non_positive_sizes(argv, capsys):
+    """Test that chunk sizes and asset thread counts below 1 are rejected."""
+    # Act & Assert
+    with pytest.raises(SystemExit):
+        parse_args(["--workers", "2"] + argv)
+    assert "must be at least 1" in capsys.readouterr().err
+
+
+# ============================================================================
+# Tests for incremental migration
+# ============================================================================
+
+def write_export(csv_file, posts):
+    """Write a small CSV export with Title, Date, Content and Slug columns."""
+    lines = ["Title,Date,Content,Slug"]
+    lines += [f"{title},2025-02-18,{content},{slug}" for title, content, slug in posts]
+    csv_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_hash_row_changes_with_content():
+    """Test that the row hash depends on every value."""
+    # Arrange
+    row = {"Title": "Test", "Content": "One"}
+    changed_row = {"Title": "Test", "Content": "Two"}
+    
+    # Act
+    row_hash = hash_row(row)
+    
+    # Assert
+    assert row_hash == hash_row(dict(row))
+    assert row_hash != hash_row(changed_row)
+
+
+def test_hash_row_changes_with_run_settings():
+    """Test that the row hash depends on the comments status and --markdown."""
+    # Arrange
+    row = {"Title": "Test", "Date": "2025-02-18", "Content": "One"}
+    open_context = RunContext(datetime(2025, 3, 1))
+    
+    # Act
+    row_hash = hash_row(row, open_context)
+    
+    # Assert
+    assert row_hash == hash_row(row, RunContext(datetime(2025, 3, 2)))
+    assert row_hash != hash_row(row, RunContext(datetime(2026, 1, 1)))
+    assert row_hash != hash_row(row, RunContext(datetime(2025, 3, 1), markdown=True))
+
+
+def test_main_incremental_only_rewrites_changes(tmp_path, capsys):
+    """Test that an incremental run skips, rewrites and removes the right posts."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    output_folder = tmp_path / "posts"
+    args = ["--input", str(csv_file), "--output", str(output_folder), "--incremental"]
+    write_export(csv_file, [("Same", "Same content", "same"),
+                            ("Changed", "Old content", "changed"),
+                            ("Deleted", "Gone soon", "deleted")])
+    main(args)
+    same_file = output_folder / "2025-02-18-same.md"
+    same_mtime = same_file.stat().st_mtime_ns
+    capsys.readouterr()
+    
+    # Act
+    write_export(csv_file, [("Same", "Same content", "same"),
+                            ("Changed", "New content", "changed"),
+                            ("Added", "Brand new", "added")])
+    main(args)
+    
+    # Assert
+    output = capsys.readouterr().out
+    assert "Successfully processed 2 posts." in output
+    assert "Skipped 1 unchanged posts and removed 1 deleted posts." in output
+    assert same_file.stat().st_mtime_ns == same_mtime
+    assert "ew content" in (output_folder / "2025-02-18-changed.md").read_text(encoding="utf-8")
+    assert not (output_folder / "2025-02-18-deleted.md").exists()
+    assert (output_folder / "2025-02-18-added.md").exists()
+    assert (output_folder / MANIFEST_FILENAME).exists()
+
+
+def test_main_incremental_rewrites_when_run_changes(tmp_path, capsys):
+    """Test that incremental runs rewrite posts when --as-of or --markdown changes their output."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    output_folder = tmp_path / "posts"
+    args = ["--input", str(csv_file), "--output", str(output_folder), "--incremental"]
+    write_export(csv_file, [("First", "<p>One</p>", "first"), ("Second", "<p>Two</p>", "second")])
+    main(args + ["--as-of", "2025-02-25"])
+    post_file = output_folder / "2025-02-18-first.md"
+    assert "comments: true" in post_file.read_text(encoding="utf-8")
+    capsys.readouterr()
+    
+    # Act
+    main(args + ["--as-of", "2026-01-01"])
+    closed_output = capsys.readouterr().out
+    closed_post = post_file.read_text(encoding="utf-8")
+    main(args + ["--as-of", "2026-01-01", "--markdown"])
+    markdown_output = capsys.readouterr().out
+    
+    # Assert
+    assert "Successfully processed 2 posts." in closed_output
+    assert "comments: false" in closed_post
+    assert "Successfully processed 2 posts." in markdown_output
+    assert "<p>" not in post_file.read_text(encoding="utf-8")
+
+
+# ============================================================================
+# Tests for BufferedMarkdownWriter
+# ============================================================================
+
+@pytest.mark.parametrize("fsync", ["none", "batch", "file"])
+def test_buffered_writer_writes_all_files(tmp_path, fsync):
+    """Test that every queued file is written under each fsync policy."""
+    # Arrange
+    writer = BufferedMarkdownWriter(str(tmp_path), threads=3, queue_size=4, batch_size=2, fsync=fsync)
+    
+    # Act
+    for i in range(10):
+        writer.write(f"post-{i}.md", f"Post {i}\n")
+    writer.close()
+    
+    # Assert
+    assert writer.files_written == 10
+    assert writer.bytes_written == sum(len(f"Post {i}\n") for i in range(10))
+    assert writer.failed == []
+    assert (tmp_path / "post-7.md").read_text(encoding="utf-8") == "Post 7\n"
+    assert "p99 write latency" in writer.summary()
+
+
+def test_buffered_writer_reports_failures(tmp_path, capsys):
+    """Test that files that cannot be written are reported as failed."""
+    # Arrange
+    writer = BufferedMarkdownWriter(str(tmp_path / "missing"), threads=1)
+    
+    # Act
+    writer.write("post.md", "Content")
+    writer.close()
+    
+    # Assert
+    assert writer.failed == ["post.md"]
+    assert "Error writing file" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("fsync", ["none", "batch", "file"])
+def test_buffered_writer_removes_failed_file(tmp_path, monkeypatch, capsys, fsync):
+    """Test that a write failing part of the way is only counted as failed and leaves no file."""
+    # Arrange
+    import wp_jekyll_migrator
+    real_iter_text = wp_jekyll_migrator.iter_text
+    
+    def failing_iter_text(content):
+        for piece in real_iter_text(content):
+            yield piece
+            if content == "Broken":
+                raise OSError("disk full")
+    
+    monkeypatch.setattr(wp_jekyll_migrator, "iter_text", failing_iter_text)
+    writer = BufferedMarkdownWriter(str(tmp_path), threads=1, batch_size=8, fsync=fsync)
+    
+    # Act
+    for filename, content in (("a.md", "A"), ("b.md", "Broken"), ("c.md", "C")):
+        writer.write(filename, content)
+    writer.close()
+    
+    # Assert
+    assert writer.failed == ["b.md"]
+    assert writer.files_written == 2
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.md", "c.md"]
+    assert "disk full" in capsys.readouterr().out
+
+
+def test_buffered_writer_rejects_unknown_fsync(tmp_path):
+    """Test that an unknown fsync policy is rejected."""
+    # Act / Assert
+    with pytest.raises(ValueError):
+        BufferedMarkdownWriter(str(tmp_path), fsync="sometimes")
+
+
+def test_main_writer_threads(tmp_path, capsys):
+    """Test a full run through the buffered writer with worker processes."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    write_export(csv_file, [(f"Post {i}", "Content", f"post-{i}") for i in range(20)])
+    output_folder = tmp_path / "posts"
+    
+    # Act
+    main(["--input", str(csv_file), "--output", str(output_folder), "--workers", "2",
+          "--writer-threads", "3", "--fsync", "batch"])
+    
+    # Assert
+    output = capsys.readouterr().out
+    assert "Successfully processed 20 posts." in output
+    assert "files/sec" in output
+    assert len(list(output_folder.glob("*.md"))) == 20
+
+
+# ============================================================================
+# Tests for ArchiveWriter
+# ============================================================================
+
+@pytest.mark.parametrize("archive_name", ["posts.tar", "posts.tar.gz", "posts.tgz"])
+def test_archive_writer_tar(tmp_path, archive_name):
+    """Test that posts are streamed into tar archives."""
+    # Arrange
+    archive_path = tmp_path / archive_name
+    writer = ArchiveWriter(str(archive_path))
+    
+    # Act
+    writer.write("2025-02-18-hello.md", "Hello\n")
+    writer.close()
+    
+    # Assert
+    with tarfile.open(archive_path) as archive:
+        assert archive.getnames() == ["2025-02-18-hello.md"]
+        assert archive.extractfile("2025-02-18-hello.md").read() == b"Hello\n"
+
+
+def test_archive_writer_zip(tmp_path):
+    """Test that posts are streamed into zip archives."""
+    # Arrange
+    archive_path = tmp_path / "posts.zip"
+    writer = ArchiveWriter(str(archive_path))
+    
+    # Act
+    writer.write("2025-02-18-hello.md", "Héllo\n")
+    writer.close()
+    
+    # Assert
+    with zipfile.ZipFile(archive_path) as archive:
+        assert archive.namelist() == ["2025-02-18-hello.md"]
+        assert archive.read("2025-02-18-hello.md").decode("utf-8") == "Héllo\n"
+    assert writer.files_written == 1
+
+
+def test_archive_writer_rejects_unknown_extension(tmp_path):
+    """Test that an unsupported archive extension is rejected."""
+    # Act / Assert
+    with pytest.raises(ValueError):
+        ArchiveWriter(str(tmp_path / "posts.rar"))
+
+
+def test_main_archive_output(tmp_path, capsys):
+    """Test a full run into an archive without creating the output folder."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    write_export(csv_file, [(f"Post {i}", "Content", f"post-{i}") for i in range(5)])
+    archive_path = tmp_path / "posts.tar.gz"
+    output_folder = tmp_path / "posts"
+    
+    # Act
+    main(["--input", str(csv_file), "--output", str(output_folder), "--archive", str(archive_path),
+          "--workers", "2"])
+    
+    # Assert
+    assert "Successfully processed 5 posts." in capsys.readouterr().out
+    assert not output_folder.exists()
+    with tarfile.open(archive_path) as archive:
+        assert archive.getnames() == [f"2025-02-18-post-{i}.md" for i in range(5)]
+
+
+# ============================================================================
+# Tests for profiling and dry runs
+# ============================================================================
+
+def test_stage_timer_stats():
+    """Test that per-stage totals and percentiles are computed."""
+    # Arrange
+    timer = StageTimer()
+    
+    # Act
+    for i in range(1, 101):
+        timer.add("process", i / 1000)
+    stats = timer.stats()
+    
+    # Assert
+    assert list(stats) == ["process"]
+    assert stats["process"]["count"] == 100
+    assert stats["process"]["total"] == pytest.approx(5.05)
+    assert stats["process"]["p50"] == pytest.approx(0.051)
+    assert stats["process"]["p99"] == pytest.approx(0.1)
+    assert "process" in timer.report()
+
+
+def test_convert_post_timed_matches_convert_post():
+    """Test that the timed pipeline produces the same post and times each stage."""
+    # Arrange
+    row = {"Title": "Hello World", "Date": "2025-02-18", "Content": "Web development is fun"}
+    timer = StageTimer()
+    
+    # Act
+    result = convert_post_timed(row, timer)
+    
+    # Assert
+    assert result == convert_post_fragments(row)
+    for stage in ("process", "dropcaps", "frontmatter", "format"):
+        assert len(timer.timings[stage]) == 1
+
+
+def test_main_dry_run_profile(tmp_path, capsys):
+    """Test that a profiled dry run writes nothing but reports every stage."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    write_export(csv_file, [(f"Post {i}", "Content", f"post-{i}") for i in range(5)])
+    output_folder = tmp_path / "posts"
+    profile_json = tmp_path / "profile.json"
+    
+    # Act
+    main(["--input", str(csv_file), "--output", str(output_folder), "--dry-run",
+          "--profile-json", str(profile_json)])
+    
+    # Assert
+    output = capsys.readouterr().out
+    assert "Successfully processed 5 posts." in output
+    assert "Dry run: no Markdown files were written." in output
+    assert not output_folder.exists()
+    stats = json.loads(profile_json.read_text(encoding="utf-8"))
+    assert list(stats) == list(PIPELINE_STAGES)
+    assert stats["write"]["count"] == 5
+
+
+# ============================================================================
+# Tests for SlugIndex
+# ============================================================================
+
+def test_slug_index_suffixes_duplicates():
+    """Test that repeated slugs get deterministic -2, -3 suffixes."""
+    # Arrange
+    index = SlugIndex()
+    
+    # Act
+    slugs = [
+        index.resolve("2025-02-18", "hello"),
+        index.resolve("2025-02-18", "hello"),
+        index.resolve("2025-03-01", "hello"),
+        index.resolve("2025-03-01", "other"),
+    ]
+    
+    # Assert
+    assert slugs == ["hello", "hello-2", "hello-3", "other"]
+    assert index.collision_count == 2
+    assert index.same_date_count == 1
+
+
+def test_slug_index_skips_taken_suffix():
+    """Test that a suffix already used by another post is skipped."""
+    # Arrange
+    index = SlugIndex()
+    index.resolve("2025-02-18", "hello-2")
+    index.resolve("2025-02-18", "hello")
+    
+    # Act
+    result = index.resolve("2025-02-18", "hello")
+    
+    # Assert
+    assert result == "hello-3"
+
+
+def test_main_resolves_slug_collisions(tmp_path, capsys):
+    """Test that duplicate slugs are written as separate posts."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    write_export(csv_file, [("First", "One", "same"), ("Second", "Two", "same")])
+    output_folder = tmp_path / "posts"
+    
+    # Act
+    main(["--input", str(csv_file), "--output", str(output_folder)])
+    
+    # Assert
+    output = capsys.readouterr().out
+    assert "Successfully processed 2 posts." in output
+    assert "Resolved 1 slug collisions" in output
+    assert "permalink: /same-2/" in (output_folder / "2025-02-18-same-2.md").read_text(encoding="utf-8")
+
+
+# ============================================================================
+# Tests for the WXR reader
+# ============================================================================
+
+SAMPLE_WXR = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"
+    xmlns:excerpt="http://wordpress.org/export/1.2/excerpt/"
+    xmlns:content="http://purl.org/rss/1.0/modules/content/"
+    xmlns:wp="http://wordpress.org/export/1.2/">
+<channel>
+    <title>Sample Blog</title>
+    <item>
+        <title>Header Image</title>
+        <wp:post_id>10</wp:post_id>
+        <wp:post_type>attachment</wp:post_type>
+        <wp:attachment_url>https://example.com/images/header.jpg</wp:attachment_url>
+    </item>
+    <item>
+        <title>Café Menu</title>
+        <content:encoded><![CDATA[<p>Web development is fun.</p>]]></content:encoded>
+        <excerpt:encoded><![CDATA[A short excerpt.]]></excerpt:encoded>
+        <wp:post_id>11</wp:post_id>
+        <wp:post_date>2025-02-18 09:30:00</wp:post_date>
+        <wp:post_name>cafe-menu</wp:post_name>
+        <wp:status>publish</wp:status>
+        <wp:post_type>post</wp:post_type>
+        <category domain="category" nicename="tutorial"><![CDATA[Tutorial]]></category>
+        <category domain="category" nicename="food"><![CDATA[Food]]></category>
+        <category domain="post_tag" nicename="coffee"><![CDATA[Coffee]]></category>
+        <wp:postmeta>
+            <wp:meta_key>_thumbnail_id</wp:meta_key>
+            <wp:meta_value>10</wp:meta_value>
+        </wp:postmeta>
+    </item>
+    <item>
+        <title>Draft Post</title>
+        <wp:post_id>12</wp:post_id>
+        <wp:status>draft</wp:status>
+        <wp:post_type>post</wp:post_type>
+    </item>
+    <item>
+        <title>About</title>
+        <wp:post_id>13</wp:post_id>
+        <wp:status>publish</wp:status>
+        <wp:post_type>page</wp:post_type>
+    </item>
+</channel>
+</rss>
+"""
+
+
+def test_read_wxr_file_yields_published_posts(tmp_path):
+    """Test that only published posts are yielded, as CSV-style rows."""
+    # Arrange
+    wxr_file = tmp_path / "export.xml"
+    wxr_file.write_text(SAMPLE_WXR, encoding="utf-8")
+    
+    # Act
+    rows = list(read_wxr_file(str(wxr_file)))
+    
+    # Assert
+    assert len(rows) == 1
+    row = rows[0]
+    assert row["Title"] == "Café Menu"
+    assert row["Date"] == "2025-02-18 09:30:00"
+    assert row["Content"] == "<p>Web development is fun.</p>"
+    assert row["Excerpt"] == "A short excerpt."
+    assert row["Slug"] == "cafe-menu"
+    assert row["Categories"] == "Tutorial, Food"
+    assert row["Tags"] == "Coffee"
+    assert row["Image Path"] == "https://example.com/images/header.jpg"
+
+
+def test_read_wxr_file_invalid_xml(tmp_path, capsys):
+    """Test that invalid XML is reported instead of crashing."""
+    # Arrange
+    wxr_file = tmp_path / "export.xml"
+    wxr_file.write_text("<rss><channel><item>", encoding="utf-8")
+    
+    # Act
+    rows = list(read_wxr_file(str(wxr_file)))
+    
+    # Assert
+    assert rows == []
+    assert "not valid XML" in capsys.readouterr().out
+
+
+def test_read_posts_picks_format_from_extension(tmp_path):
+    """Test that .xml files are read as WXR and others as CSV."""
+    # Arrange
+    wxr_file = tmp_path / "export.xml"
+    wxr_file.write_text(SAMPLE_WXR, encoding="utf-8")
+    csv_file = tmp_path / "export.csv"
+    write_export(csv_file, [("Post", "Content", "post")])
+    
+    # Act
+    wxr_rows = list(read_posts(str(wxr_file)))
+    csv_rows = list(read_posts(str(csv_file)))
+    
+    # Assert
+    assert wxr_rows[0]["Slug"] == "cafe-menu"
+    assert csv_rows[0]["Slug"] == "post"
+
+
+def test_main_wxr_input(tmp_path, capsys):
+    """Test a full migration from a WXR export."""
+    # Arrange
+    wxr_file = tmp_path / "export.xml"
+    wxr_file.write_text(SAMPLE_WXR, encoding="utf-8")
+    output_folder = tmp_path / "posts"
+    
+    # Act
+    main(["--input", str(wxr_file), "--output", str(output_folder)])
+    
+    # Assert
+    assert "Successfully processed 1 posts." in capsys.readouterr().out
+    markdown = (output_folder / "2025-02-18-cafe-menu.md").read_text(encoding="utf-8")
+    assert "image: /assets/images/header.jpg" in markdown
+    assert "categories: [Tutorial, Food]" in markdown
+
+
+# ============================================================================
+# Tests for the parallel CSV reader
+# ============================================================================
+
+MULTILINE_CSV = (
+    'Title,Date,Content,Slug\r\n'
+    'First,2025-01-01,"Line one\nLine ""two""\n\nLine three",first\r\n'
+    'Second,2025-01-02,Plain content,second\r\n'
+    'Third,2025-01-03,"Quoted, with comma\nand a newline",third\r\n'
+    'Fourth,2025-01-04,"Ñandú ""quoted""",fourth\r\n'
+)
+
+
+def test_find_csv_chunks_keeps_records_whole():
+    """Test that chunk boundaries never fall inside a quoted field."""
+    # Arrange
+    data = MULTILINE_CSV.encode("utf-8")
+    
+    # Act
+    header_end, chunks = find_csv_chunks(data, 8)
+    
+    # Assert
+    assert data[:header_end] == b"Title,Date,Content,Slug\r\n"
+    assert chunks[0][0] == header_end
+    assert chunks[-1][1] == len(data)
+    starts = [data[start:start + 5] for start, end in chunks]
+    assert starts == [b"First", b"Secon", b"Third", b"Fourt"]
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 16, 1024])
+def test_read_csv_parallel_matches_read_csv_file(tmp_path, chunk_bytes):
+    """Test that parallel parsing yields the same rows in the same order."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    csv_file.write_bytes(MULTILINE_CSV.encode("utf-8"))
+    
+    # Act
+    rows = list(read_csv_parallel(str(csv_file), 2, chunk_bytes))
+    
+    # Assert
+    assert rows == list(read_csv_file(str(csv_file)))
+    assert rows[0]["Content"] == 'Line one\nLine "two"\n\nLine three'
+
+
+def test_read_csv_parallel_missing_file(tmp_path, capsys):
+    """Test that a missing CSV yields nothing and reports an error."""
+    # Act
+    rows = list(read_csv_parallel(str(tmp_path / "missing.csv"), 2))
+    
+    # Assert
+    assert rows == []
+    assert "not found" in capsys.readouterr().out
+
+
+# ============================================================================
+# Tests for asset rewriting and copying
+# ============================================================================
+
+def test_rewrite_asset_urls():
+    """Test that image URLs in HTML and Markdown content are rewritten."""
+    # Arrange
+    content = ('<img src="https://example.com/images/2024/a.jpg" alt="A"> '
+               '![B](http://example.com/images/b.png) https://example.com/about')
+    
+    # Act
+    result = rewrite_asset_urls(content)
+    
+    # Assert
+    assert result == ('<img src="/assets/images/2024/a.jpg" alt="A"> '
+                      '![B](/assets/images/b.png) https://example.com/about')
+
+
+def test_process_post_row_rewrites_content_images():
+    """Test that processing a row rewrites images in the content."""
+    # Arrange
+    row = {"Title": "Photos", "Date": "2025-01-01",
+           "Content": '<img src="https://example.com/images/photo.jpg">'}
+    
+    # Act
+    result = process_post_row(row)
+    
+    # Assert
+    assert result["content"] == '<img src="/assets/images/photo.jpg">'
+
+
+def test_process_post_row_rewrites_http_featured_image():
+    """Test that an http:// featured image is rewritten like images in the content."""
+    # Arrange
+    row = {"Title": "Photos", "Date": "2025-01-01", "Image Path": "http://example.com/images/z.jpg"}
+    
+    # Act
+    result = process_post_row(row)
+    
+    # Assert
+    assert result["image"] == "/assets/images/z.jpg"
+
+
+def test_asset_copier_copies_and_deduplicates(tmp_path):
+    """Test that referenced images are copied once and duplicates are linked."""
+    # Arrange
+    mirror = tmp_path / "mirror"
+    (mirror / "2024").mkdir(parents=True)
+    (mirror / "2024" / "a.jpg").write_bytes(b"same image")
+    (mirror / "b.jpg").write_bytes(b"same image")
+    (mirror / "c.jpg").write_bytes(b"other image")
+    assets = tmp_path / "assets"
+    rows = [
+        {"Image Path": "https://example.com/images/c.jpg",
+         "Content": '<img src="https://example.com/images/2024/a.jpg">'},
+        {"Content": "![b](https://example.com/images/b.jpg) ![a](https://example.com/images/2024/a.jpg)"},
+        {"Content": '<img src="https://example.com/images/missing.jpg">'},
+    ]
+    copier = AssetCopier(str(mirror), str(assets), threads=2)
+    
+    # Act
+    passed = list(copier.collect_rows(rows))
+    copier.close()
+    
+    # Assert
+    assert passed == rows
+    assert (assets / "2024" / "a.jpg").read_bytes() == b"same image"
+    assert (assets / "b.jpg").read_bytes() == b"same image"
+    assert (assets / "c.jpg").read_bytes() == b"other image"
+    assert copier.copied == 2
+    assert copier.missing == ["missing.jpg"]
+    assert "1 duplicates linked" in copier.summary()
+
+
+def test_asset_copier_copies_duplicates_of_failed_copy(tmp_path, capsys):
+    """Test that duplicates of an image that could not be copied are copied themselves."""
+    # Arrange
+    mirror = tmp_path / "mirror"
+    (mirror / "a").mkdir(parents=True)
+    for name in ("a/x.jpg", "b.jpg", "c.jpg"):
+        (mirror / name).write_bytes(b"same image")
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    (assets / "a").write_bytes(b"a file where a folder should be")
+    copier = AssetCopier(str(mirror), str(assets), threads=1)
+    
+    # Act
+    for path in ("a/x.jpg", "b.jpg", "c.jpg"):
+        copier.add(path)
+    copier.close()
+    
+    # Assert
+    assert (assets / "b.jpg").read_bytes() == b"same image"
+    assert (assets / "c.jpg").read_bytes() == b"same image"
+    assert copier.missing == ["a/x.jpg"]
+    assert copier.copied == 1
+    assert copier.linked == 1
+    assert "(1 duplicates linked, 0 unchanged, 1 missing)" in copier.summary()
+    assert "Error copying image" in capsys.readouterr().out
+
+
+def test_asset_copier_skips_unchanged_and_unsafe_paths(tmp_path):
+    """Test that images already in place and paths outside the mirror are not copied."""
+    # Arrange
+    mirror = tmp_path / "mirror"
+    mirror.mkdir()
+    (mirror / "a.jpg").write_bytes(b"image")
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    (assets / "a.jpg").write_bytes(b"image")
+    copier = AssetCopier(str(mirror), str(assets))
+    
+    # Act
+    copier.add("a.jpg")
+    copier.add("../secret.jpg")
+    copier.close()
+    
+    # Assert
+    assert copier.copied == 0
+    assert copier.unchanged == 1
+    assert copier.missing == ["../secret.jpg"]
+
+
+def test_main_copies_assets(tmp_path, capsys):
+    """Test that the migrator copies images with --asset-mirror."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    csv_file.write_text(
+        "Title,Date,Content,Image Path\n"
+        'Photos,2025-01-01,"<img src=""https://example.com/images/in.jpg"">",https://example.com/images/top.jpg\n',
+        encoding="utf-8",
+    )
+    mirror = tmp_path / "mirror"
+    mirror.mkdir()
+    (mirror / "in.jpg").write_bytes(b"inline")
+    (mirror / "top.jpg").write_bytes(b"header")
+    assets = tmp_path / "assets"
+    output = tmp_path / "posts"
+    
+    # Act
+    main(["--input", str(csv_file), "--output", str(output),
+          "--asset-mirror", str(mirror), "--asset-output", str(assets)])
+    
+    # Assert
+    assert (assets / "in.jpg").read_bytes() == b"inline"
+    assert (assets / "top.jpg").read_bytes() == b"header"
+    post = (output / "2025-01-01-photos.md").read_text(encoding="utf-8")
+    assert '<img src="/assets/images/in.jpg">' in post
+    assert "Copied 2 images" in capsys.readouterr().out
+
+
+# ============================================================================
+# Tests for html_to_markdown function
+# ============================================================================
+
+def test_html_to_markdown_plain_text_unchanged():
+    """Test that content without HTML tags is returned as is."""
+    # Arrange
+    content = "Plain text\n\nwith   spacing & symbols."
+    
+    # Act & Assert
+    assert html_to_markdown(content) == content
+
+
+def test_html_to_markdown_paragraphs_and_headings():
+    """Test paragraphs, headings, emphasis and entities."""
+    # Arrange
+    content = "<h2>Tips &amp; Tricks</h2>\n<p>First   <strong>bold</strong>\nparagraph.</p><p>Second <em>one</em>.</p>"
+    
+    # Act
+    result = html_to_markdown(content)
+    
+    # Assert
+    assert result == "## Tips &amp; Tricks\n\nFirst **bold** paragraph.\n\nSecond *one*."
+
+
+def test_html_to_markdown_links_and_images():
+    """Test that links and images become Markdown links and images."""
+    # Arrange
+    content = ('<p>See <a href="https://example.org/?a=1&amp;b=2">the docs</a>.</p>'
+               "<p><img alt='A photo' src=\"/assets/images/a.jpg\" /></p>")
+    
+    # Act
+    result = html_to_markdown(content)
+    
+    # Assert
+    assert result == "See [the docs](https://example.org/?a=1&b=2).\n\n![A photo](/assets/images/a.jpg)"
+
+
+def test_html_to_markdown_nested_lists():
+    """Test unordered and nested ordered lists."""
+    # Arrange
+    content = "<ul>\n<li>One</li>\n<li>Two<ol><li>First</li><li>Second</li></ol></li>\n</ul><p>After</p>"
+    
+    # Act
+    result = html_to_markdown(content)
+    
+    # Assert
+    assert result == "- One\n- Two\n  1. First\n  2. Second\n\nAfter"
+
+
+def test_html_to_markdown_paragraphs_in_list_items():
+    """Test that paragraphs inside list items stay on the item's marker line."""
+    # Arrange
+    content = ("<ul><li><p>one</p></li><li><p>two</p><p>more</p></li></ul>"
+               "<ol><li><p>x</p><ul><li>in</li></ul></li></ol>")
+    
+    # Act
+    result = html_to_markdown(content)
+    
+    # Assert
+    assert result == "- one\n- two\n\n  more\n\n1. x\n   - in"
+
+
+def test_html_to_markdown_emphasis_whitespace():
+    """Test that spaces inside emphasis tags are moved outside the markers."""
+    # Arrange
+    content = "<p>a<strong> bold </strong>b <em>x </em>y <em> </em>z</p>"
+    
+    # Act
+    result = html_to_markdown(content)
+    
+    # Assert
+    assert result == "a **bold** b *x* y z"
+
+
+def test_html_to_markdown_code():
+    """Test that code blocks keep their whitespace and inline code is marked."""
+    # Arrange
+    content = ("<p>Call <code>f()</code>:</p><pre><code>\ndef f(x):\n    return x &lt; 1\n</code></pre>"
+               "<script>alert(1)</script><!-- note -->Done")
+    
+    # Act
+    result = html_to_markdown(content)
+    
+    # Assert
+    assert result == "Call `f()`:\n\n```\ndef f(x):\n    return x < 1\n```\n\nDone"
+
+
+def test_html_to_markdown_escapes_text():
+    """Test that escaped HTML and Markdown characters in text stay text."""
+    # Arrange
+    content = ("<p>Use &lt;div&gt; &lt;script&gt;alert(1)&lt;/script&gt;</p><p>*not emphasis* [x]</p>"
+               '<p># not a heading</p><p>1. not a list</p><p><img alt="A]x" src="i.jpg"></p>')
+    
+    # Act
+    result = html_to_markdown(content)
+    
+    # Assert
+    assert result == ("Use &lt;div&gt; &lt;script&gt;alert(1)&lt;/script&gt;\n\n\\*not emphasis\\* \\[x\\]\n\n"
+                      "\\# not a heading\n\n1\\. not a list\n\n![A\\]x](i.jpg)")
+
+
+def test_html_to_markdown_blockquotes():
+    """Test that blockquotes keep their "> " prefix on every line."""
+    # Arrange
+    content = "<p>Before</p><blockquote><p>One</p><p>Two <code>a &lt; b</code></p></blockquote><p>After</p>"
+    
+    # Act
+    result = html_to_markdown(content)
+    
+    # Assert
+    assert result == "Before\n\n> One\n>\n> Two `a < b`\n\nAfter"
+
+
+def test_convert_post_markdown_context():
+    """Test that convert_post converts content only when the context asks for it."""
+    # Arrange
+    row = {"Title": "Test", "Date": "2025-01-01", "Content": "<p>Hello <b>world</b></p>"}
+    
+    # Act
+    _, html_content = convert_post(row, context=RunContext(datetime(2025, 6, 1)))
+    _, markdown_content = convert_post(row, context=RunContext(datetime(2025, 6, 1), markdown=True))
+    
+    # Assert
+    assert '<p><span class="dropcaps">H</span>ello <b>world</b></p>' in html_content
+    assert '<span class="dropcaps">H</span>ello **world**' in markdown_content
+
+
+# ============================================================================
+# Tests for resumable migrations
+# ============================================================================
+
+def test_main_resume_after_crash(tmp_path, monkeypatch, capsys):
+    """Test that --resume only converts the posts an interrupted run did not finish."""
+    # Arrange
+    import wp_jekyll_migrator
+    csv_file = tmp_path / "export.csv"
+    output = tmp_path / "posts"
+    write_export(csv_file, [(f"Post {n}", f"Body {n}", f"post-{n}") for n in range(1, 6)])
+    real_write = wp_jekyll_migrator.write_markdown_file
+    written = []
+    
+    def crashing_write(output_folder, filename, content):
+        if len(written) == 3:
+            raise RuntimeError("crash")
+        written.append(filename)
+        return real_write(output_folder, filename, content)
+    
+    monkeypatch.setattr(wp_jekyll_migrator, "write_markdown_file", crashing_write)
+    argv = ["--input", str(csv_file), "--output", str(output), "--checkpoint-every", "2"]
+    with pytest.raises(RuntimeError):
+        main(argv)
+    checkpoint = json.loads((tmp_path / "posts.new" / CHECKPOINT_FILENAME).read_text(encoding="utf-8"))
+    crashed_output_exists = output.exists()
+    written.clear()
+    monkeypatch.setattr(wp_jekyll_migrator, "write_markdown_file",
+                        lambda *args: written.append(args[1]) or real_write(*args))
+    
+    # Act
+    main(argv + ["--resume"])
+    
+    # Assert
+    assert checkpoint["rows"] == 2
+    assert not crashed_output_exists
+    assert written == ["2025-02-18-post-3.md", "2025-02-18-post-4.md", "2025-02-18-post-5.md"]
+    assert len(list(output.glob("*.md"))) == 5
+    assert len(json.loads((output / MANIFEST_FILENAME).read_text(encoding="utf-8"))) == 5
+    assert not (output / CHECKPOINT_FILENAME).exists()
+    output_text = capsys.readouterr().out
+    assert "Successfully processed 5 posts." in output_text
+    assert "Resumed after 2 posts" in output_text
+
+
+def test_checkpoint_rejects_changed_export(tmp_path, capsys):
+    """Test that a checkpoint made from a different export is not used."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    write_export(csv_file, [("Post", "Body", "post")])
+    checkpoint = Checkpoint(str(tmp_path), str(csv_file))
+    checkpoint.save(1, 1, RunContext(datetime(2025, 6, 1)))
+    write_export(csv_file, [("Post", "Body", "post"), ("Other", "Body", "other")])
+    
+    # Act
+    loaded = Checkpoint(str(tmp_path), str(csv_file)).load()
+    
+    # Assert
+    assert loaded is False
+    assert "different export" in capsys.readouterr().out
+
+
+def test_main_resume_without_checkpoint(tmp_path, capsys):
+    """Test that --resume without a checkpoint runs the whole export."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    output = tmp_path / "posts"
+    write_export(csv_file, [("Post", "Body", "post")])
+    
+    # Act
+    main(["--input", str(csv_file), "--output", str(output), "--resume"])
+    
+    # Assert
+    out = capsys.readouterr().out
+    assert "starting from the beginning" in out
+    assert "Successfully processed 1 posts." in out
+
+
+# ============================================================================
+# Tests for swapping the output folder into place
+# ============================================================================
+
+def test_main_keeps_live_folder_until_swap(tmp_path, monkeypatch):
+    """Test that a failed full run leaves the existing posts in place."""
+    # Arrange
+    import wp_jekyll_migrator
+    csv_file = tmp_path / "export.csv"
+    output = tmp_path / "posts"
+    write_export(csv_file, [("Post", "Body", "post")])
+    main(["--input", str(csv_file), "--output", str(output)])
+    
+    def failing_write(output_folder, filename, content):
+        raise RuntimeError("crash")
+    
+    monkeypatch.setattr(wp_jekyll_migrator, "write_markdown_file", failing_write)
+    
+    # Act
+    with pytest.raises(RuntimeError):
+        main(["--input", str(csv_file), "--output", str(output)])
+    
+    # Assert
+    assert (output / "2025-02-18-post.md").exists()
+    assert (tmp_path / "posts.new").exists()
+
+
+def test_swap_output_folder_keeps_previous_generation(tmp_path):
+    """Test that swapping keeps one previous generation and deletes older ones."""
+    # Arrange
+    output = tmp_path / "posts"
+    for generation in ("first", "second", "third"):
+        build = tmp_path / "posts.new"
+        build.mkdir()
+        (build / f"{generation}.md").write_text(generation, encoding="utf-8")
+        
+        # Act
+        cleanup = swap_output_folder(str(build), str(output))
+        if cleanup is not None:
+            cleanup.join()
+    
+    # Assert
+    assert [path.name for path in output.iterdir()] == ["third.md"]
+    assert [path.name for path in (tmp_path / "posts.previous").iterdir()] == ["second.md"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["posts", "posts.previous"]
+
+
+def test_rollback_output_folder(tmp_path, capsys):
+    """Test that --rollback swaps the output with the previous generation."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    output = tmp_path / "posts"
+    write_export(csv_file, [("Old", "Body", "old")])
+    main(["--input", str(csv_file), "--output", str(output)])
+    write_export(csv_file, [("New", "Body", "new")])
+    main(["--input", str(csv_file), "--output", str(output)])
+    
+    # Act
+    main(["--output", str(output), "--rollback"])
+    
+    # Assert
+    assert [path.name for path in output.glob("*.md")] == ["2025-02-18-old.md"]
+    assert [path.name for path in (tmp_path / "posts.previous").glob("*.md")] == ["2025-02-18-new.md"]
+    assert "Rolled" in capsys.readouterr().out
+    assert rollback_output_folder(str(tmp_path / "missing")) is False
+
+
+# ============================================================================
+# Tests for category and tag index pages
+# ============================================================================
+
+def test_split_terms():
+    """Test that terms are split on commas, trimmed and deduplicated."""
+    # Act & Assert
+    assert split_terms("Web Design, Python,, Python ,Tips") == ("Web Design", "Python", "Tips")
+    assert split_terms("") == ()
+
+
+def test_taxonomy_index_writes_pages(tmp_path):
+    """Test that archive pages list each term's posts, newest first."""
+    # Arrange
+    index = TaxonomyIndex(RunContext(datetime(2025, 6, 1)))
+    rows = [
+        {"Title": "Old [draft]", "Date": "2025-01-01", "Slug": "old", "Categories": "Python, Tips", "Tags": "intro"},
+        {"Title": "New", "Date": "2025-03-01", "Slug": "new", "Categories": "Python", "Tags": ""},
+        {"Title": "Plain", "Date": "2025-02-01", "Slug": "plain"},
+    ]
+    (tmp_path / "categories").mkdir()
+    (tmp_path / "categories" / "stale.md").write_text("old page", encoding="utf-8")
+    (tmp_path / "categories" / "about-categories.md").write_text("hand-written page", encoding="utf-8")
+    (tmp_path / "_data").mkdir()
+    (tmp_path / "_data" / "categories.json").write_text(
+        json.dumps({"Stale": {"slug": "stale", "url": "/categories/stale/", "count": 1}}), encoding="utf-8")
+    
+    # Act
+    assert list(index.collect_rows(rows)) == rows
+    page_counts = index.write(str(tmp_path))
+    
+    # Assert
+    assert page_counts == {"categories": 3, "tags": 1}
+    assert sorted(path.name for path in (tmp_path / "categories").iterdir()) == [
+        "about-categories.md", "python.md", "tips.md", "uncategorized.md"]
+    page = (tmp_path / "categories" / "python.md").read_text(encoding="utf-8")
+    assert page == ('---\nlayout: category\ntitle: "Python"\ncategory: "Python"\n'
+                    "permalink: /categories/python/\n---\n"
+                    "- [New](/new/) (2025-03-01)\n"
+                    "- [Old \\[draft\\]](/old/) (2025-01-01)\n")
+    assert "layout: tag" in (tmp_path / "tags" / "intro.md").read_text(encoding="utf-8")
+    data = json.loads((tmp_path / "_data" / "categories.json").read_text(encoding="utf-8"))
+    assert data["Python"] == {"slug": "python", "url": "/categories/python/", "count": 2}
+
+
+def test_taxonomy_index_term_slug_collision(tmp_path):
+    """Test that terms with the same slug get separate pages."""
+    # Arrange
+    index = TaxonomyIndex(RunContext(datetime(2025, 6, 1)))
+    index.add({"Title": "A", "Date": "2025-01-01", "Categories": "Café, Cafe"})
+    
+    # Act
+    index.write(str(tmp_path))
+    
+    # Assert
+    data = json.loads((tmp_path / "_data" / "categories.json").read_text(encoding="utf-8"))
+    assert sorted(entry["slug"] for entry in data.values()) == ["cafe", "cafe-2"]
+
+
+def test_main_index_pages(tmp_path, capsys):
+    """Test that the migrator writes index pages with --index-pages."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    write_export(csv_file, [("First", "Body", "first"), ("Second", "Body", "second")])
+    site = tmp_path / "site"
+    
+    # Act
+    main(["--input", str(csv_file), "--output", str(site / "_posts"), "--index-pages", str(site)])
+    
+    # Assert
+    page = (site / "categories" / "uncategorized.md").read_text(encoding="utf-8")
+    assert "- [First](/first/) (2025-02-18)\n- [Second](/second/) (2025-02-18)\n" in page
+    assert "Wrote 1 category pages and 0 tag pages" in capsys.readouterr().out
+
+
+# ============================================================================
+# Tests for the asyncio driver
+# ============================================================================
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_migrate_rows_async_matches_sync(tmp_path, workers):
+    """Test that the asyncio driver writes the same posts in the same order."""
+    # Arrange
+    rows = [{"Title": f"Post {i}", "Date": "2025-02-18", "Content": "Content"} for i in range(12)]
+    rows[3]["Slug"] = "custom"
+    context = RunContext(datetime(2025, 6, 1))
+    sync_folder = tmp_path / "sync"
+    async_folder = tmp_path / "async"
+    sync_folder.mkdir()
+    async_folder.mkdir()
+    sync_counts = Counter()
+    async_counts = Counter()
+    
+    # Act
+    expected = list(migrate_rows(rows, str(sync_folder), fallback_counts=sync_counts, context=context))
+    results = list(iter_async(migrate_rows_async(rows, str(async_folder), concurrency=5, workers=workers,
+                                                 fallback_counts=async_counts, context=context)))
+    
+    # Assert
+    assert results == expected
+    assert async_counts == sync_counts
+    for filename, written in expected:
+        assert (async_folder / filename).read_text(encoding="utf-8") == (sync_folder / filename).read_text(
+            encoding="utf-8")
+
+
+def test_main_async_posts(tmp_path, capsys):
+    """Test that main writes every post with --async-posts."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    output = tmp_path / "posts"
+    write_export(csv_file, [(f"Post {n}", "Body", f"post-{n}") for n in range(7)])
+    
+    # Act
+    main(["--input", str(csv_file), "--output", str(output), "--async-posts", "3"])
+    
+    # Assert
+    assert len(list(output.glob("*.md"))) == 7
+    assert "Successfully processed 7 posts." in capsys.readouterr().out
+
+
+def test_async_posts_rejects_profile():
+    """Test that --async-posts cannot be combined with --profile."""
+    # Act & Assert
+    with pytest.raises(SystemExit):
+        parse_args(["--async-posts", "4", "--profile"])
+
+
+# ============================================================================
+# Tests for Markdown fragments
+# ============================================================================
+
+def test_dropcaps_fragments_reference_body():
+    """Test that the body is referenced as a range of the original content."""
+    # Arrange
+    content = "  <p>Hello world</p>\n"
+    
+    # Act
+    fragments = dropcaps_fragments(content)
+    
+    # Assert
+    assert fragments == ['<p><span class="dropcaps">H</span>', (content, 6, 20)]
+    assert fragments[1][0] is content
+    assert join_fragments(fragments) == add_dropcaps(content)
+
+
+def test_iter_text_chunks_long_fragments():
+    """Test that long fragments are yielded in bounded pieces."""
+    # Arrange
+    body = "x" * (MARKDOWN_WRITE_CHUNK * 2 + 10)
+    fragments = markdown_fragments("---\n", [(body, 5, len(body))])
+    
+    # Act
+    pieces = list(iter_text(fragments))
+    
+    # Assert
+    assert max(len(piece) for piece in pieces) == MARKDOWN_WRITE_CHUNK
+    assert "".join(pieces) == "---\n\n" + body[5:] + "\n"
+    assert list(iter_text("short")) == ["short"]
+
+
+def test_writers_accept_fragments(tmp_path):
+    """Test that every writer writes the same bytes for fragments and strings."""
+    # Arrange
+    row = {"Title": "Big", "Date": "2025-01-01", "Content": "<p>Año " + "word " * 40_000 + "</p>"}
+    filename, fragments = convert_post_fragments(row, context=RunContext(datetime(2025, 6, 1)))
+    expected = join_fragments(fragments)
+    buffered = BufferedMarkdownWriter(str(tmp_path / "buffered"), threads=1)
+    (tmp_path / "buffered").mkdir()
+    (tmp_path / "direct").mkdir()
+    archive = ArchiveWriter(str(tmp_path / "posts.tar"))
+    
+    # Act
+    write_markdown_file(str(tmp_path / "direct"), filename, fragments)
+    buffered.write(filename, fragments)
+    buffered.close()
+    archive.write(filename, fragments)
+    archive.close()
+    
+    # Assert
+    assert (tmp_path / "direct" / filename).read_text(encoding="utf-8") == expected
+    assert (tmp_path / "buffered" / filename).read_text(encoding="utf-8") == expected
+    assert buffered.bytes_written == len(expected.encode("utf-8"))
+    with tarfile.open(tmp_path / "posts.tar") as tar:
+        assert tar.extractfile(filename).read().decode("utf-8") == expected
+
+
+# ============================================================================
+# Tests for column mappings
+# ============================================================================
+
+PLUGIN_CSV = (
+    "post_title,post_date,post_content,featured_image,post_name,extra\n"
+    'First Post,2025-01-01,"Body, with comma",https://example.com/images/a.jpg,first,x\n'
+    "Second Post,2025-01-02,Short,,,\n"
+    "Ragged,2025-01-03\n"
+)
+
+PLUGIN_COLUMNS = {
+    "Title": "post_title",
+    "Date": "post_date",
+    "Content": "post_content",
+    "Image Path": "featured_image",
+    "Slug": "post_name",
+}
+
+
+def test_read_mapped_csv_uses_mapping(tmp_path):
+    """Test that mapped headers are read into the migrator's columns."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    csv_file.write_text(PLUGIN_CSV, encoding="utf-8")
+    
+    # Act
+    rows = list(read_mapped_csv(str(csv_file), ColumnMapping(PLUGIN_COLUMNS)))
+    
+    # Assert
+    assert all(isinstance(row, ExportRow) for row in rows)
+    assert rows[0].get("Title") == "First Post"
+    assert rows[0].get("Content") == "Body, with comma"
+    assert rows[0].get("Image Path") == "https://example.com/images/a.jpg"
+    assert rows[0].get("Excerpt") is None
+    assert rows[1].get("Slug") == ""
+    assert rows[2].get("Content") is None
+    assert process_post_row(rows[0])["slug"] == "first"
+
+
+def test_read_mapped_csv_matches_dict_rows(tmp_path):
+    """Test that the default mapping converts posts exactly like DictReader rows."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    write_export(csv_file, [("Same", "Body", "same"), ("Same", "Other", "same"), ("Third", "Body", "")])
+    context = RunContext(datetime(2025, 6, 1))
+    
+    # Act
+    mapped = [convert_post(row, context=context) for row in SlugIndex(context).resolve_rows(
+        read_mapped_csv(str(csv_file)))]
+    expected = [convert_post(row, context=context) for row in SlugIndex(context).resolve_rows(
+        read_csv_file(str(csv_file)))]
+    
+    # Assert
+    assert mapped == expected
+    assert mapped[1][0] == "2025-02-18-same-2.md"
+
+
+def test_read_mapped_csv_missing_header(tmp_path, capsys):
+    """Test that a mapping naming a header the export lacks is reported."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    csv_file.write_text(PLUGIN_CSV, encoding="utf-8")
+    mapping = ColumnMapping({"Title": "post_title", "Tags": "post_tags"})
+    
+    # Act
+    rows = list(read_mapped_csv(str(csv_file), mapping))
+    
+    # Assert
+    assert rows == []
+    assert "has no header for Tags ('post_tags')" in capsys.readouterr().out
+
+
+def test_column_mapping_load_toml_and_json(tmp_path):
+    """Test that mappings load from TOML and JSON files."""
+    # Arrange
+    pytest.importorskip("tomllib")
+    toml_file = tmp_path / "columns.toml"
+    toml_file.write_text('[columns]\nTitle = "post_title"\n"Image Path" = "featured_image"\n', encoding="utf-8")
+    json_file = tmp_path / "columns.json"
+    json_file.write_text(json.dumps({"columns": {"Title": "post_title", "Image Path": "featured_image"}}),
+                         encoding="utf-8")
+    
+    # Act
+    toml_mapping = ColumnMapping.load(str(toml_file))
+    json_mapping = ColumnMapping.load(str(json_file))
+    
+    # Assert
+    assert toml_mapping.headers == json_mapping.headers
+    assert toml_mapping.headers["Image Path"] == "featured_image"
+    assert toml_mapping.headers["Date"] == "Date"
+
+
+def test_column_mapping_rejects_unknown_column(tmp_path):
+    """Test that --columns rejects columns the migrator does not know."""
+    # Arrange
+    config = tmp_path / "columns.json"
+    config.write_text(json.dumps({"columns": {"Author": "post_author"}}), encoding="utf-8")
+    
+    # Act & Assert
+    with pytest.raises(SystemExit):
+        parse_args(["--columns", str(config)])
+
+
+def test_main_with_column_mapping(tmp_path):
+    """Test that main migrates an export with plugin headers."""
+    # Arrange
+    csv_file = tmp_path / "export.csv"
+    csv_file.write_text(PLUGIN_CSV, encoding="utf-8")
+    config = tmp_path / "columns.json"
+    config.write_text(json.dumps({"columns": PLUGIN_COLUMNS}), encoding="utf-8")
+    output = tmp_path / "posts"
+    
+    # Act
+    main(["--input", str(csv_file), "--output", str(output), "--columns", str(config), "--reader-workers", "2"])
+    
+    # Assert
+    assert sorted(path.name for path in output.glob("*.md")) == [
+        "2025-01-01-first.md", "2025-01-02-second-post.md", "2025-01-03-ragged.md"]
+    post = (output / "2025-01-01-first.md").read_text(encoding="utf-8")
+    assert 'title: "First Post"' in post
+    assert "image: /assets/images/a.jpg" in post
+
+
+# ============================================================================
+# Tests for the Post class
+# ============================================================================
+
+def test_process_post_row_returns_post():
+    """Test that processed posts are slotted but still read like dictionaries."""
+    # Arrange
+    row = {"Title": "Hello World", "Date": "2025-01-01", "Content": "Body", "Slug": "hello"}
+    
+    # Act
+    post = process_post_row(row)
+    
+    # Assert
+    assert isinstance(post, Post)
+    assert not hasattr(post, "__dict__")
+    assert post["title"] == post.title == "Hello World"
+    assert post["slug"] == "hello"
+    with pytest.raises(KeyError):
+        post["author"]
+
+
+def test_post_equality_and_as_dict():
+    """Test that posts compare by their fields."""
+    # Arrange
+    row = {"Title": "Hello World", "Date": "2025-01-01", "Content": "Body"}
+    
+    # Act
+    first = process_post_row(row)
+    second = process_post_row(dict(row))
+    
+    # Assert
+    assert first == second
+    assert first.as_dict()["title"] == "Hello World"
+    assert list(first.as_dict()) == list(Post.__slots__)
+
+
+def test_generate_frontmatter_accepts_post_or_dict():
+    """Test that front matter is the same for a Post and its dictionary."""
+    # Arrange
+    post = process_post_row({"Title": "Hello", "Date": "2025-01-01", "Categories": "News, Tech"})
+    
+    # Act
+    from_post = generate_frontmatter(post)
+    from_dict = generate_frontmatter(post.as_dict())
+    
+    # Assert
+    assert from_post == from_dict
+    assert 'title: "Hello"' in from_post
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -1,142 +1,1088 @@
 """
 WordPress to Jekyll Migrator.
 
-This module provides functionality to convert WordPress export data (CSV format)
-into Jekyll-compatible Markdown files with proper frontmatter formatting.
+This module provides functionality to convert WordPress export data (CSV format,
+or WordPress's WXR XML format) into Jekyll-compatible Markdown files with proper
+frontmatter formatting.
 """
 
 import os
 import csv
-from datetime import datetime
+from datetime import datetime, timedelta
 import re
 import unicodedata
 import shutil
+import argparse
+import asyncio
+import cProfile
+import hashlib
+import io
+import json
+import mmap
+import queue
+import tarfile
+import threading
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from array import array
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from html import unescape
+from itertools import islice
+from operator import attrgetter, itemgetter
 
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
 
+
+# Number of rows handed to a worker process at a time in --workers mode
+DEFAULT_CHUNK_SIZE = 500
+
+# Number of posts the asyncio driver keeps in flight by default
+DEFAULT_ASYNC_POSTS = 64
+
+# Input formats the migrator can read, and the extensions that select them
+INPUT_FORMATS = ("csv", "wxr")
+WXR_EXTENSIONS = (".xml", ".wxr")
+
+# Columns the migrator reads from an export, and where each one sits in an
+# ExportRow
+POST_COLUMNS = ("Title", "Date", "Content", "Excerpt", "Image Path", "Slug", "Categories", "Tags")
+POST_COLUMN_INDEX = {column: index for index, column in enumerate(POST_COLUMNS)}
+
+# Size of the byte ranges the parallel CSV reader hands to each worker, and
+# the quotes it counts in place in the memory-mapped export to find them
+DEFAULT_READER_CHUNK_BYTES = 8 * 1024 * 1024
+CSV_QUOTE_PATTERN = re.compile(rb'"')
+
+# WordPress image URLs and where Jekyll serves the same files from
+ASSET_URL_PREFIX = "/assets/images/"
+IMAGE_URL_PATTERN = re.compile(r"https?://example\.com/images/([^\s\"'<>()?#]+)")
+DEFAULT_ASSET_FOLDER = os.path.join("assets", "images")
+ASSET_HASH_BLOCK = 1024 * 1024
+
+# One pattern that splits HTML into comments, tags and text in a single pass
+HTML_TOKEN_PATTERN = re.compile(
+    r"<!--.*?-->"
+    r"|<(/?)([a-zA-Z][a-zA-Z0-9]*)((?:[^>\"']|\"[^\"]*\"|'[^']*')*)>"
+    r"|[^<]+|<",
+    re.DOTALL,
+)
+HTML_ATTRIBUTE_PATTERN = re.compile(r"""([a-zA-Z_:][-\w:.]*)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""")
+HTML_WHITESPACE_PATTERN = re.compile(r"[ \t\r\n\f]+")
+HTML_BLOCK_TAGS = frozenset(["p", "div", "section", "article", "header", "footer", "figure", "table"])
+HTML_HEADING_LEVELS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+HTML_EMPHASIS_MARKS = {"strong": "**", "b": "**", "em": "*", "i": "*"}
+HTML_SKIPPED_TAGS = frozenset(["script", "style"])
+
+# Escapes text outside code so it stays text in Markdown: HTML special
+# characters are kept as entities and Markdown markup characters get a
+# backslash, as do "#", "-" and "+" or a number and "." starting a line
+MARKDOWN_TEXT_TABLE = str.maketrans({
+    "&": "&amp;", "<": "&lt;", ">": "&gt;",
+    "\\": "\\\\", "*": "\\*", "_": "\\_", "[": "\\[", "]": "\\]", "`": "\\`",
+})
+MARKDOWN_ESCAPED_PATTERN = re.compile(r"[&<>\\*_\[\]`]")
+MARKDOWN_LINE_MARKS = frozenset("#-+")
+MARKDOWN_ORDERED_PATTERN = re.compile(r"\d+(?=[.)])")
+
+# Leading whitespace and HTML tags followed by the letter that gets the dropcap;
+# script, style, pre and code tags are not skipped, since their text is not prose
+DROPCAPS_PATTERN = re.compile(r"\s*((?:<(?!/?(?i:script|style|pre|code)\b)[^<>]*>\s*)*)(\w)")
+LEADING_SPACE_PATTERN = re.compile(r"\s*")
+
+# Largest piece of a post body copied at a time when it is written out
+MARKDOWN_WRITE_CHUNK = 64 * 1024
+
+# Formats accepted in the Date column when it is not an ISO date
+DATE_FORMATS = ("%Y/%m/%d %H:%M:%S", "%Y/%m/%d", "%m/%d/%Y %H:%M:%S", "%m/%d/%Y")
+
+# Number of distinct Date values format_post_date remembers
+DATE_CACHE_SIZE = 8192
+
+# Values that can be written as plain (unquoted) YAML scalars: they start
+# with a letter, underscore or slash, contain no YAML indicators, do not
+# end in a space and are not words YAML reads as booleans or null
+YAML_PLAIN_PATTERN = re.compile(r"(?!(?i:true|false|yes|no|on|off|y|n|null)$)"
+                                r"(?:[^\W\d]|/)(?:[\w./ ,()+-]*[\w./,()+-])?")
+
+# Dates that Jekyll reads as dates when left unquoted
+YAML_DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}(?: \d{2}:\d{2}:\d{2})?")
+
+# Number of distinct categories, image paths and dates the YAML
+# formatters remember
+YAML_CACHE_SIZE = 4096
+
+# Line breaks YAML folds that JSON leaves unescaped
+YAML_LINE_BREAK_TABLE = str.maketrans({"\x85": "\\u0085", "\u2028": "\\u2028", "\u2029": "\\u2029"})
+
+# Post fields written to the frontmatter, read from a Post or a dictionary
+FRONTMATTER_ATTRIBUTES = attrgetter("title", "pub_date", "categories", "image", "slug", "excerpt", "tags")
+FRONTMATTER_KEYS = itemgetter("title", "pub_date", "categories", "image", "slug", "excerpt")
+
+# Posts older than this many days are published with comments turned off
+COMMENTS_OPEN_DAYS = 90
+
+# Pipeline stages timed by --profile, in the order they run for each post
+PIPELINE_STAGES = ("read", "process", "markdown", "dropcaps", "frontmatter", "format", "write")
+
+# Number of slug collisions listed in the report at the end of a run
+COLLISION_REPORT_LIMIT = 20
+
+# Name of the file in the output folder that remembers what each post was built from,
+# and the version of the post format, which is bumped whenever the output changes
+MANIFEST_FILENAME = ".migrator-manifest"
+MANIFEST_FORMAT_VERSION = 3
+
+# Name of the file in the output folder that lets a crashed run be resumed,
+# and how many posts are written between checkpoints
+CHECKPOINT_FILENAME = ".migrator-checkpoint"
+CHECKPOINT_INTERVAL = 1000
+
+# Suffixes of the sibling folders a full run is built in and the previous
+# generation is kept in
+STAGING_SUFFIX = ".new"
+PREVIOUS_SUFFIX = ".previous"
+
+# Folders of the generated category and tag archive pages, and the number
+# of distinct category and tag strings whose split terms are cached
+TAXONOMY_FOLDERS = {"categories": "categories", "tags": "tags"}
+TERM_CACHE_SIZE = 4096
+
+# Escapes the brackets of post titles used as Markdown link text
+LINK_TEXT_TABLE = str.maketrans({"[": "\\[", "]": "\\]"})
+
+# When the buffered writer calls fsync: never, once per batch, or after every file
+FSYNC_POLICIES = ("none", "batch", "file")
+
+# Archive formats ArchiveWriter can produce, by file extension
+ARCHIVE_MODES = {
+    ".tar": "w",
+    ".tar.gz": "w:gz",
+    ".tgz": "w:gz",
+    ".zip": "zip",
+}
+
+
+def _build_slug_table():
+    """
+    Builds the str.translate table used by sanitize_slug.
+    Lowercases ASCII letters, turns separators into hyphens and drops
+    every other character that is not allowed in a slug.
+    """
+    table = {}
+    for code in range(128):
+        char = chr(code)
+        if char in SLUG_SEPARATORS:
+            table[code] = "-"
+        elif char.isalnum() or char == "-":
+            table[code] = char.lower()
+        else:
+            table[code] = None
+    return table
+
+
+# Characters that become a hyphen in a slug; everything else that is not
+# a letter, digit or hyphen is removed
+SLUG_SEPARATORS = " :/\\"
+SLUG_TABLE = _build_slug_table()
+
+# Number of distinct titles sanitize_slug remembers; the title of a row
+# without a Slug is slugged by SlugIndex, TaxonomyIndex and process_post_row
+# in turn, so only the first of those calls does the work
+SLUG_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=SLUG_CACHE_SIZE)
 def sanitize_slug(title):
     """
     Takes a string title and returns a URL-safe slug.
     Normalizes Unicode, removes accents, and replaces invalid characters.
     """
-    # Normalize the title to decompose accented characters
-    normalized_title = unicodedata.normalize('NFKD', title)
-    # Remove accents by keeping only ASCII characters
-    ascii_title = normalized_title.encode('ascii', 'ignore').decode('utf-8')
-    
-    # Replace invalid characters with valid ones
-    replacements = {
-        ":": "-",
-        "/": "-",
-        "\\": "-",
-        "?": "",
-        "*": "",
-        "<": "",
-        ">": "",
-        "|": "",
-        "\"": "",
-        "'": "",
-    }
+    if not title.isascii():
+        # Normalize the title to decompose accented characters
+        normalized_title = unicodedata.normalize('NFKD', title)
+        # Remove accents by keeping only ASCII characters
+        title = normalized_title.encode('ascii', 'ignore').decode('utf-8')
     
-    slug = ascii_title.lower().replace(" ", "-")
-    for invalid_char, valid_char in replacements.items():
-        slug = slug.replace(invalid_char, valid_char)
-    # Remove any remaining invalid characters
-    slug = re.sub(r"[^a-zA-Z0-9\-]", "", slug)
-    return slug
+    # Lowercase, replace separators and remove invalid characters in one pass
+    return title.translate(SLUG_TABLE)
+
+
+class ExportRow(tuple):
+    """
+    One export row holding the POST_COLUMNS values by position.
+    It answers get() and items() like the dictionaries csv.DictReader
+    yields, but is a single small tuple per row instead of a hash table
+    of every column in the export.
+    """
+
+    __slots__ = ()
+
+    def get(self, column, default=None):
+        """
+        Returns the value of a column, or default if it is missing.
+        """
+        index = POST_COLUMN_INDEX.get(column)
+        if index is None or self[index] is None:
+            return default
+        return self[index]
+
+    def items(self):
+        """
+        Returns (column, value) pairs for every column.
+        """
+        return zip(POST_COLUMNS, self)
+
+    def replace(self, column, value):
+        """
+        Returns a copy of the row with one column changed.
+        """
+        values = list(self)
+        values[POST_COLUMN_INDEX[column]] = value
+        return ExportRow(values)
+
+
+def with_column(row, column, value):
+    """
+    Returns a copy of an ExportRow or dictionary row with one column changed.
+    """
+    if isinstance(row, ExportRow):
+        return row.replace(column, value)
+    return dict(row, **{column: value})
+
+
+class ColumnMapping:
+    """
+    Maps the columns the migrator reads to the headers of an export, so
+    exports from different plugins can be migrated without editing them.
+    Columns that are not mapped are looked up under their own name. The
+    mapping is compiled against an export's header once, into a function
+    that turns each csv.reader list into an ExportRow by position.
+    """
+
+    def __init__(self, columns=None):
+        columns = dict(columns or {})
+        unknown = sorted(set(columns) - set(POST_COLUMNS))
+        if unknown:
+            raise ValueError(f"unknown columns {', '.join(unknown)}; expected some of {', '.join(POST_COLUMNS)}")
+        for column, header in columns.items():
+            if not isinstance(header, str) or not header:
+                raise ValueError(f"the header for column '{column}' must be a non-empty string")
+        self.headers = {column: columns.get(column, column) for column in POST_COLUMNS}
+        self.required = [column for column in POST_COLUMNS if column in columns]
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a mapping from a JSON or TOML file whose "columns" table maps
+        column names to export headers, for example
+        {"columns": {"Title": "post_title", "Image Path": "featured_image"}}.
+        Raises ValueError if the file is not a valid mapping.
+        """
+        if path.lower().endswith(".toml"):
+            if tomllib is None:
+                raise ValueError("TOML column mappings need Python 3.11 or newer")
+            with open(path, "rb") as config_file:
+                try:
+                    config = tomllib.load(config_file)
+                except tomllib.TOMLDecodeError as e:
+                    raise ValueError(f"'{path}' is not valid TOML: {e}")
+        else:
+            with open(path, "r", encoding="utf-8") as config_file:
+                try:
+                    config = json.load(config_file)
+                except ValueError as e:
+                    raise ValueError(f"'{path}' is not valid JSON: {e}")
+        if not isinstance(config, dict) or not isinstance(config.get("columns"), dict):
+            raise ValueError(f"'{path}' must have a \"columns\" table")
+        return cls(config["columns"])
+
+    def row_factory(self, header):
+        """
+        Compiles the mapping against an export's header row.
+        Returns a function that turns a list of values into an ExportRow.
+        Raises ValueError if a column the mapping names is not in the header.
+        """
+        positions = {}
+        for index, name in enumerate(header):
+            positions.setdefault(name, index)
+        missing = [f"{column} ('{self.headers[column]}')" for column in self.required
+                   if self.headers[column] not in positions]
+        if missing:
+            raise ValueError(f"has no header for {', '.join(missing)}")
+        
+        # Columns the export lacks read a None appended after the last value
+        width = len(header)
+        pick = itemgetter(*[positions.get(self.headers[column], width) for column in POST_COLUMNS])
+        
+        def make_row(values):
+            if len(values) != width:
+                values = values[:width] + [None] * (width - len(values))
+            values.append(None)
+            return ExportRow(pick(values))
+        
+        return make_row
+
+
+def read_mapped_csv(csv_file, mapping=None):
+    """
+    Reads a WordPress export CSV with csv.reader and yields ExportRows.
+    The column mapping is compiled against the header once, so each row
+    is picked apart by position rather than turned into a dictionary.
+    """
+    if mapping is None:
+        mapping = ColumnMapping()
+    try:
+        with open(csv_file, "r", encoding="utf-8", newline="") as file:
+            reader = csv.reader(file)
+            header = next(reader, None)
+            if header is None:
+                return
+            try:
+                make_row = mapping.row_factory(header)
+            except ValueError as e:
+                print(f"Error: CSV file '{csv_file}' {e}.")
+                return
+            for values in reader:
+                if values:
+                    yield make_row(values)
+    except FileNotFoundError:
+        print(f"Error: CSV file '{csv_file}' not found.")
 
 
 def read_csv_file(csv_file):
     """
-    Reads WordPress export CSV and returns all posts.
-    Returns a list of dictionaries containing post data.
+    Reads WordPress export CSV and yields posts one at a time.
+    Yields a dictionary containing post data for each row, so the whole
+    export never has to sit in memory at once.
     """
-    posts = []
     try:
-        with open(csv_file, "r", encoding="utf-8") as file:
+        with open(csv_file, "r", encoding="utf-8", newline="") as file:
             reader = csv.DictReader(file)
             for row in reader:
-                posts.append(row)
+                yield row
+    except FileNotFoundError:
+        print(f"Error: CSV file '{csv_file}' not found.")
+
+
+def next_record_end(data, start, quote_parity):
+    """
+    Returns the offset just past the first newline at or after start that
+    is not inside a quoted field. quote_parity is 1 if start itself is
+    inside quotes. Doubled quotes ("") inside a field cancel out, so a
+    newline ends a record exactly when an even number of quotes came before it.
+    """
+    position = start
+    while True:
+        newline = data.find(b"\n", position)
+        if newline == -1:
+            return len(data)
+        quote_parity ^= len(CSV_QUOTE_PATTERN.findall(data, position, newline)) & 1
+        if quote_parity == 0:
+            return newline + 1
+        position = newline + 1
+
+
+def find_csv_chunks(data, chunk_bytes):
+    """
+    Splits the bytes of a CSV export into ranges that hold whole records.
+    Returns the end of the header record and a list of (start, end) ranges
+    of roughly chunk_bytes each, never splitting a quoted multi-line field.
+    Quotes are counted in place, so no range is copied out of the map.
+    """
+    header_end = next_record_end(data, 0, 0)
+    chunks = []
+    start = header_end
+    while start < len(data):
+        target = min(start + chunk_bytes, len(data))
+        quote_parity = len(CSV_QUOTE_PATTERN.findall(data, start, target)) & 1
+        end = next_record_end(data, target, quote_parity)
+        chunks.append((start, end))
+        start = end
+    return header_end, chunks
+
+
+def parse_csv_chunk(csv_file, start, end):
+    """
+    Parses one byte range of a CSV export in a worker process.
+    Returns a list of rows, each a list of column values.
+    """
+    with open(csv_file, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            text = data[start:end].decode("utf-8")
+    return [values for values in csv.reader(io.StringIO(text, newline="")) if values]
+
+
+def make_row(fieldnames, values):
+    """
+    Builds a row dictionary from column values the same way csv.DictReader
+    does: missing values are None and extra values are listed under None.
+    """
+    row = dict(zip(fieldnames, values))
+    if len(values) > len(fieldnames):
+        row[None] = values[len(fieldnames):]
+    elif len(values) < len(fieldnames):
+        for fieldname in fieldnames[len(values):]:
+            row[fieldname] = None
+    return row
+
+
+def read_csv_parallel(csv_file, workers, chunk_bytes=DEFAULT_READER_CHUNK_BYTES, mapping=None):
+    """
+    Reads a WordPress export CSV across worker processes.
+    The file is memory-mapped and split into byte ranges on record
+    boundaries, each range is parsed by a worker, and the rows are
+    yielded in file order as the same dictionaries read_csv_file yields,
+    or as ExportRows when a column mapping is given.
+    """
+    try:
+        file = open(csv_file, "rb")
     except FileNotFoundError:
         print(f"Error: CSV file '{csv_file}' not found.")
-        return []
+        return
+    with file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            header_end, chunks = find_csv_chunks(data, chunk_bytes)
+            header = data[:header_end].decode("utf-8")
+    fieldnames = next(csv.reader(io.StringIO(header, newline="")), [])
+    if mapping is None:
+        def build_row(values):
+            return make_row(fieldnames, values)
+    else:
+        try:
+            build_row = mapping.row_factory(fieldnames)
+        except ValueError as e:
+            print(f"Error: CSV file '{csv_file}' {e}.")
+            return
     
-    return posts
+    # Keep only a few ranges in flight so parsed rows do not pile up in memory
+    max_pending = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for start, end in chunks:
+            pending.append(executor.submit(parse_csv_chunk, csv_file, start, end))
+            if len(pending) >= max_pending:
+                for values in pending.popleft().result():
+                    yield build_row(values)
+        while pending:
+            for values in pending.popleft().result():
+                yield build_row(values)
+
+
+def local_name(tag):
+    """
+    Returns an XML tag without its "{namespace}" prefix.
+    """
+    return tag.rsplit("}", 1)[-1]
+
+
+def wxr_item_to_row(item, attachment_urls):
+    """
+    Converts a WXR <item> element into the row dictionary that
+    process_post_row expects. Attachment items are remembered in
+    attachment_urls so later posts can use them as featured images.
+    Returns None for anything that is not a published post.
+    """
+    fields = {}
+    categories = []
+    tags = []
+    thumbnail_id = None
+    for child in item:
+        name = local_name(child.tag)
+        if name == "category":
+            if child.get("domain") == "category":
+                categories.append(child.text or "")
+            elif child.get("domain") == "post_tag":
+                tags.append(child.text or "")
+        elif name == "postmeta":
+            meta = {local_name(entry.tag): entry.text for entry in child}
+            if meta.get("meta_key") == "_thumbnail_id":
+                thumbnail_id = meta.get("meta_value")
+        elif name == "encoded":
+            # content:encoded and excerpt:encoded share a local name
+            fields["excerpt" if "excerpt" in child.tag else "content"] = child.text or ""
+        else:
+            fields[name] = child.text or ""
+    
+    post_type = fields.get("post_type", "post")
+    if post_type == "attachment":
+        attachment_urls[fields.get("post_id", "")] = fields.get("attachment_url", "")
+        return None
+    if post_type != "post" or fields.get("status", "publish") != "publish":
+        return None
+    
+    return {
+        "id": fields.get("post_id", ""),
+        "Date": fields.get("post_date", ""),
+        "Title": fields.get("title", ""),
+        "Excerpt": fields.get("excerpt", ""),
+        "Content": fields.get("content", ""),
+        "Image Path": attachment_urls.get(thumbnail_id, ""),
+        "Categories": ", ".join(categories),
+        "Tags": ", ".join(tags),
+        "Slug": fields.get("post_name", ""),
+    }
+
+
+def read_wxr_file(wxr_file):
+    """
+    Reads a WordPress WXR (XML) export and yields posts one at a time.
+    Yields the same row dictionaries as read_csv_file. The file is parsed
+    incrementally and every finished element is cleared, so memory stays
+    constant however large the export is. Featured images are found only
+    for attachments that appear before the post in the export.
+    """
+    attachment_urls = {}
+    depth = 0
+    channel = None
+    try:
+        for event, element in ET.iterparse(wxr_file, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if depth == 2:
+                    channel = element
+                continue
+            depth -= 1
+            # Only handle elements directly inside <channel>, once they are complete
+            if depth != 2:
+                continue
+            if local_name(element.tag) == "item":
+                row = wxr_item_to_row(element, attachment_urls)
+                if row is not None:
+                    yield row
+            element.clear()
+            channel.remove(element)
+    except FileNotFoundError:
+        print(f"Error: WXR file '{wxr_file}' not found.")
+    except ET.ParseError as e:
+        print(f"Error: WXR file '{wxr_file}' is not valid XML: {e}")
 
 
-def process_post_row(row):
+def read_posts(input_file, input_format=None, reader_workers=0, mapping=None):
+    """
+    Reads posts from a CSV or WXR export and yields them one at a time.
+    The format is picked from the file extension unless one is given.
+    CSV exports are parsed across reader_workers processes when it is
+    greater than zero, and are read through the column mapping when one
+    is given.
+    """
+    if input_format is None:
+        input_format = "wxr" if input_file.lower().endswith(WXR_EXTENSIONS) else "csv"
+    if input_format == "wxr":
+        return read_wxr_file(input_file)
+    if reader_workers > 0:
+        return read_csv_parallel(input_file, reader_workers, mapping=mapping)
+    if mapping is not None:
+        return read_mapped_csv(input_file, mapping)
+    return read_csv_file(input_file)
+
+
+def parse_post_date(pub_date):
+    """
+    Parses a WordPress publication date into a date.
+    Accepts "YYYY-MM-DD" and WordPress's "YYYY-MM-DD HH:MM:SS" through the
+    fast ISO path, then falls back to the other DATE_FORMATS.
+    Raises ValueError if the date is not in any known format.
+    """
+    value = pub_date.strip()
+    try:
+        return datetime.fromisoformat(value).date()
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized post date '{pub_date}'")
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def format_post_date(pub_date):
+    """
+    Returns a publication date as a "YYYY-MM-DD" string.
+    Results are memoized on the raw string, since many posts in an
+    export share the same date.
+    """
+    return parse_post_date(pub_date).strftime("%Y-%m-%d")
+
+
+def get_column(row, column, default, fallback_counts=None):
+    """
+    Returns the value of a column, or a default when it is missing or empty.
+    The default may be a function, which is only called when it is needed.
+    Each fallback is counted in fallback_counts when a Counter is given.
+    """
+    value = row.get(column)
+    if value:
+        return value
+    if fallback_counts is not None:
+        fallback_counts[column] += 1
+    return default() if callable(default) else default
+
+
+class Post:
+    """
+    The processed data of one post, as produced by process_post_row.
+    Fields are kept in __slots__, so a post carries no per-instance
+    dictionary. Fields can also be read as post["title"], like the
+    dictionaries the pipeline used to pass around.
+    """
+
+    __slots__ = ("title", "pub_date", "date", "content", "excerpt", "image", "slug", "categories", "tags")
+
+    def __init__(self, title, pub_date, date, content, excerpt, image, slug, categories, tags=""):
+        self.title = title
+        self.pub_date = pub_date
+        self.date = date
+        self.content = content
+        self.excerpt = excerpt
+        self.image = image
+        self.slug = slug
+        self.categories = categories
+        self.tags = tags
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __eq__(self, other):
+        if not isinstance(other, Post):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"Post({fields})"
+
+    def as_dict(self):
+        """
+        Returns the post as a dictionary of its fields.
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def process_post_row(row, fallback_counts=None, context=None):
     """
     Processes a single post row and returns formatted post data.
-    Returns a dictionary with extracted and processed post information.
+    Returns a Post with extracted and processed post information.
+    Defaults are only computed for columns that are missing or empty,
+    and a missing date falls back to the run context's reference time.
     """
-    title = row.get("Title", "Untitled")
-    pub_date = row.get("Date", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-    content_text = row.get("Content", "No content available.")
-    custom_excerpt = row.get("Excerpt", "This is a default excerpt.")
-    image_url = row.get("Image Path", "/assets/images/default.jpg")
-    slug = row.get("Slug", sanitize_slug(title))
-    categories = row.get("Categories", "Uncategorized")
+    def default_date():
+        return (context or RunContext()).default_pub_date()
+    
+    title = get_column(row, "Title", "Untitled", fallback_counts)
+    pub_date = get_column(row, "Date", default_date, fallback_counts)
+    content_text = get_column(row, "Content", "No content available.", fallback_counts)
+    custom_excerpt = get_column(row, "Excerpt", "This is a default excerpt.", fallback_counts)
+    image_url = get_column(row, "Image Path", None, fallback_counts)
+    slug = get_column(row, "Slug", lambda: sanitize_slug(title), fallback_counts)
+    categories = get_column(row, "Categories", "Uncategorized", fallback_counts)
+    tags = row.get("Tags") or ""
     
     # Handle image path transformation
-    if "Image Path" in row:
-        image_url = image_url.replace("https://example.com/images/", "/assets/images/")
+    if image_url is None:
+        image_url = "/assets/images/default.jpg"
+    else:
+        image_url = rewrite_asset_urls(image_url)
+    content_text = rewrite_asset_urls(content_text)
     
     # Format the date for the filename
-    date = datetime.strptime(pub_date, "%Y-%m-%d").strftime("%Y-%m-%d")
+    date = format_post_date(pub_date)
     
-    return {
-        "title": title,
-        "pub_date": pub_date,
-        "date": date,
-        "content": content_text,
-        "excerpt": custom_excerpt,
-        "image": image_url,
-        "slug": slug,
-        "categories": categories,
-    }
+    return Post(title, pub_date, date, content_text, custom_excerpt, image_url, slug, categories, tags)
+
+
+def rewrite_asset_urls(content_text):
+    """
+    Points every WordPress image URL in the content at the Jekyll assets folder.
+    Returns the content unchanged if it has no image URLs.
+    """
+    if "example.com/images/" not in content_text:
+        return content_text
+    return IMAGE_URL_PATTERN.sub(ASSET_URL_PREFIX + r"\1", content_text)
+
+
+def html_attributes(attribute_text):
+    """
+    Parses the attributes of an HTML tag into a dictionary of unescaped values.
+    """
+    attributes = {}
+    for name, double_quoted, single_quoted, bare in HTML_ATTRIBUTE_PATTERN.findall(attribute_text):
+        value = double_quoted or single_quoted or bare
+        attributes[name.lower()] = unescape(value) if "&" in value else value
+    return attributes
+
+
+def html_to_markdown(content_text):
+    """
+    Converts the HTML of a WordPress post into Markdown.
+    The HTML is read once, token by token, and Markdown is emitted as each
+    tag is seen. Paragraphs, headings, links, images, lists, blockquotes,
+    emphasis and code are converted; other tags are dropped and their text
+    is kept. Text outside code is escaped, so entities such as &lt;script&gt;
+    and characters such as "*" stay text instead of becoming HTML or markup.
+    Content without any tags is returned unchanged.
+    """
+    if "<" not in content_text:
+        return content_text
+    
+    out = []
+    append = out.append
+    newlines = 0        # newlines owed before the next output
+    line_start = True   # leading whitespace is dropped at the start of a line
+    lists = []          # [ordered, item count, item indent] for each open list
+    item_start = False  # a list item marker was written and no text yet
+    emphasis = ""       # emphasis marks opened but not written yet
+    links = []          # href of each open link
+    quotes = 0          # depth of open blockquotes
+    written_quotes = 0  # blockquote depth of the last line written
+    pre = 0
+    code = 0
+    skip = None
+    
+    def end_block(count):
+        nonlocal newlines, line_start
+        if out:
+            out[-1] = out[-1].rstrip(" ")
+            newlines = max(newlines, count)
+        line_start = True
+    
+    def write(text):
+        nonlocal newlines, line_start, written_quotes, item_start
+        if newlines:
+            # Blank lines stay inside a blockquote only if both sides are in it,
+            # and lines inside a list item are indented to its text
+            blank = "\n" + ">" * min(quotes, written_quotes)
+            indent = " " * lists[-1][2] if lists else ""
+            append(blank * (newlines - 1) + "\n" + "> " * quotes + indent)
+            newlines = 0
+        elif quotes and not out:
+            append("> " * quotes)
+        append(text)
+        written_quotes = quotes
+        line_start = item_start = False
+    
+    def open_emphasis():
+        nonlocal emphasis
+        if emphasis:
+            marks, emphasis = emphasis, ""
+            write(marks)
+    
+    for match in HTML_TOKEN_PATTERN.finditer(content_text):
+        closing, tag, attribute_text = match.groups()
+        if tag is None:
+            text = match.group()
+            if skip or text.startswith("<!--"):
+                continue
+            if "&" in text:
+                text = unescape(text)
+            if pre:
+                # A newline right after <pre> is not part of the code
+                if line_start and text.startswith("\n"):
+                    text = text[1:]
+                if quotes:
+                    text = text.replace("\n", "\n" + "> " * quotes)
+                if text:
+                    write(text)
+                continue
+            if "\n" in text or "  " in text or "\t" in text:
+                text = HTML_WHITESPACE_PATTERN.sub(" ", text)
+            if not code and MARKDOWN_ESCAPED_PATTERN.search(text):
+                text = text.translate(MARKDOWN_TEXT_TABLE)
+            if line_start:
+                text = text.lstrip(" ")
+                if not code and text:
+                    if text[0] in MARKDOWN_LINE_MARKS:
+                        text = "\\" + text
+                    else:
+                        number = MARKDOWN_ORDERED_PATTERN.match(text)
+                        if number:
+                            text = f"{number.group()}\\{text[number.end():]}"
+            elif text.startswith(" ") and out and out[-1].endswith(" "):
+                text = text.lstrip(" ")
+            if emphasis:
+                # Markdown emphasis cannot start with a space, so it goes first
+                stripped = text.lstrip(" ")
+                if stripped:
+                    if len(stripped) < len(text):
+                        write(" ")
+                    text = stripped
+                    open_emphasis()
+            if text:
+                write(text)
+            continue
+        
+        tag = tag.lower()
+        if skip:
+            if closing and tag == skip:
+                skip = None
+        elif tag in HTML_SKIPPED_TAGS:
+            if not closing:
+                skip = tag
+        elif tag in HTML_BLOCK_TAGS:
+            # Paragraphs in a list item stay in the item: the first one
+            # follows the marker and later ones are indented under it
+            if not lists:
+                end_block(2)
+            elif closing:
+                end_block(1)
+            elif not item_start:
+                end_block(2)
+        elif tag in HTML_EMPHASIS_MARKS:
+            mark = HTML_EMPHASIS_MARKS[tag]
+            if not closing:
+                emphasis += mark
+            elif emphasis.endswith(mark):
+                emphasis = emphasis[:-len(mark)]
+            else:
+                # Markdown emphasis cannot end with a space, so it goes after
+                trailing = not line_start and out[-1].endswith(" ")
+                if trailing:
+                    out[-1] = out[-1].rstrip(" ")
+                write(mark)
+                if trailing:
+                    write(" ")
+        elif tag == "a":
+            if not closing:
+                href = html_attributes(attribute_text).get("href")
+                links.append(href)
+                if href:
+                    open_emphasis()
+                    write("[")
+            elif links:
+                href = links.pop()
+                if href:
+                    write(f"]({href})")
+        elif tag == "img":
+            attributes = html_attributes(attribute_text)
+            if attributes.get("src"):
+                alt = attributes.get("alt", "").translate(LINK_TEXT_TABLE)
+                open_emphasis()
+                write(f"![{alt}]({attributes['src']})")
+        elif tag in HTML_HEADING_LEVELS:
+            end_block(2)
+            if not closing:
+                write("#" * HTML_HEADING_LEVELS[tag] + " ")
+                line_start = True
+        elif tag == "blockquote":
+            end_block(2)
+            if closing:
+                quotes = max(quotes - 1, 0)
+            else:
+                quotes += 1
+        elif tag in ("ul", "ol"):
+            if closing:
+                if lists:
+                    lists.pop()
+            else:
+                parent_indent = lists[-1][2] if lists else 0
+                lists.append([tag == "ol", 0, parent_indent])
+            end_block(1 if lists else 2)
+        elif tag == "li":
+            end_block(1)
+            if not closing:
+                if not lists:
+                    lists.append([False, 0, 0])
+                item = lists[-1]
+                item[1] += 1
+                marker = f"{item[1]}. " if item[0] else "- "
+                # The marker is indented to the text of the enclosing item
+                item[2] = lists[-2][2] if len(lists) > 1 else 0
+                write(marker)
+                item[2] += len(marker)
+                line_start = item_start = True
+        elif tag == "pre":
+            if closing:
+                if pre:
+                    pre -= 1
+                if out and not out[-1].endswith("\n"):
+                    append("\n")
+                if quotes:
+                    append("> " * quotes)
+                append("```")
+                end_block(2)
+            else:
+                end_block(2)
+                write("```\n" + "> " * quotes)
+                line_start = True
+                pre += 1
+        elif tag == "code":
+            if not pre:
+                if not closing:
+                    open_emphasis()
+                write("`")
+                code = max(code - 1, 0) if closing else code + 1
+        elif tag == "br":
+            write("  ")
+            newlines = 1
+            line_start = True
+        elif tag == "hr":
+            end_block(2)
+            write("---")
+            end_block(2)
+    
+    return "".join(out).strip()
+
+
+def convert_content(content_text, context=None):
+    """
+    Converts post content to Markdown when the run asks for it.
+    Returns the content unchanged otherwise.
+    """
+    if context is not None and context.markdown:
+        return html_to_markdown(content_text)
+    return content_text
+
+
+def dropcaps_fragments(content_text):
+    """
+    Adds HTML dropcaps to the first letter of content without copying it.
+    Leading whitespace and HTML tags are skipped, so the letter is wrapped
+    inside a leading <p> rather than the tag itself; content that starts
+    with a <script>, <style>, <pre> or <code> tag gets no dropcap. Only
+    the start and end of the content are scanned, so long posts cost no
+    more than short ones.
+    Returns a list of fragments: the new prefix as a string, then the rest
+    of the body, without surrounding whitespace, as a (text, start, end)
+    range of the original content.
+    """
+    end = len(content_text)
+    while end and content_text[end - 1].isspace():
+        end -= 1
+    match = DROPCAPS_PATTERN.match(content_text)
+    if match is None:
+        start = LEADING_SPACE_PATTERN.match(content_text).end()
+        return [(content_text, start, end)] if start < end else [content_text]
+    leading_tags, letter = match.groups()
+    return [f'{leading_tags}<span class="dropcaps">{letter}</span>', (content_text, match.end(), end)]
 
 
 def add_dropcaps(content_text):
     """
     Adds HTML dropcaps to the first letter of content.
-    Returns the modified content with dropcaps applied.
-    """
-    if content_text.strip():
-        content_text = re.sub(
-            r"^(\w)", 
-            r'<span class="dropcaps">\1</span>', 
-            content_text.strip(), 
-            count=1
-        )
-    return content_text
+    Returns the modified content with surrounding whitespace removed.
+    """
+    return join_fragments(dropcaps_fragments(content_text))
+
+
+class RunContext:
+    """
+    Settings that are fixed for the whole migration run.
+    The reference time is captured once, so every post is judged against
+    the same clock, and the comments cutoff is kept as a "YYYY-MM-DD"
+    string that publication dates can be compared with directly.
+    """
+
+    def __init__(self, as_of=None, comments_open_days=COMMENTS_OPEN_DAYS, markdown=False):
+        self.as_of = as_of or datetime.now()
+        self.markdown = markdown
+        cutoff = self.as_of.date() - timedelta(days=comments_open_days)
+        self.comments_cutoff = cutoff.strftime("%Y-%m-%d")
+
+    def default_pub_date(self):
+        """
+        Returns the publication date used for posts without a Date.
+        """
+        return self.as_of.strftime("%Y-%m-%d %H:%M:%S")
+
+    def comments_open(self, pub_date):
+        """
+        Returns True if a post published on pub_date still takes comments.
+        """
+        return format_post_date(pub_date) >= self.comments_cutoff
+
+
+def yaml_quoted(value):
+    """
+    Returns a value as a double-quoted YAML scalar.
+    Quotes, backslashes, control characters and line breaks are escaped,
+    so titles and excerpts always produce valid YAML that loads back
+    unchanged.
+    """
+    if value.isprintable():
+        if '"' in value or "\\" in value:
+            value = value.replace("\\", "\\\\").replace('"', '\\"')
+        return f'"{value}"'
+    # A JSON string is also a valid double-quoted YAML scalar
+    return json.dumps(value, ensure_ascii=False).translate(YAML_LINE_BREAK_TABLE)
+
+
+@lru_cache(maxsize=YAML_CACHE_SIZE)
+def yaml_scalar(value):
+    """
+    Returns a value as a plain YAML scalar when that is safe, or as a
+    double-quoted scalar when it could be misread (colons, leading
+    indicators, numbers or words like "true").
+    """
+    if YAML_PLAIN_PATTERN.fullmatch(value):
+        return value
+    return yaml_quoted(value)
+
+
+@lru_cache(maxsize=YAML_CACHE_SIZE)
+def yaml_date(value):
+    """
+    Returns a publication date as a YAML scalar, left plain when it is
+    in a format Jekyll reads as a date.
+    """
+    if YAML_DATE_PATTERN.fullmatch(value):
+        return value
+    return yaml_quoted(value)
+
+
+@lru_cache(maxsize=TERM_CACHE_SIZE)
+def yaml_terms(value):
+    """
+    Returns a comma-separated Categories or Tags value as a YAML flow list
+    of its terms, split the same way as the archive pages split them, so
+    Jekyll files the post under the same categories and tags.
+    """
+    return f"[{', '.join(yaml_scalar(term) for term in split_terms(value))}]"
 
 
-def generate_frontmatter(post_data):
+def yaml_permalink(slug):
+    """
+    Returns the "/slug/" permalink for a post as a YAML scalar.
+    """
+    if slug.isascii() and slug.replace("-", "").isalnum():
+        return f"/{slug}/"
+    return yaml_scalar(f"/{slug}/")
+
+
+def generate_frontmatter(post_data, context=None):
     """
     Takes post metadata and returns Jekyll YAML frontmatter string.
-    Includes layout, title, date, categories, image, permalink, excerpt, and comments.
+    The metadata is a Post or a dictionary with the same keys, where
+    "tags" may be left out.
+    Includes layout, title, date, categories, tags, image, permalink, excerpt, and comments.
+    Post age is measured against the run context, or now if none is given.
     """
-    title = post_data["title"]
-    pub_date = post_data["pub_date"]
-    image = post_data["image"]
-    excerpt = post_data["excerpt"]
-    slug = post_data["slug"]
-    categories = post_data["categories"]
+    if context is None:
+        context = RunContext()
+    
+    if type(post_data) is Post:
+        title, pub_date, categories, image, slug, excerpt, tags = FRONTMATTER_ATTRIBUTES(post_data)
+    else:
+        title, pub_date, categories, image, slug, excerpt = FRONTMATTER_KEYS(post_data)
+        tags = post_data.get("tags", "")
     
     # Determine comments status based on post age
-    comments_status = "false" if (datetime.now() - datetime.strptime(pub_date, "%Y-%m-%d")).days > 90 else "true"
-    
-    frontmatter = f"""---
-layout: post
-title: "{title}"
-date: {pub_date}
-categories: {categories}
-image: {image}
-permalink: /{slug}/
-custom_excerpt: "{excerpt}"
-comments: {comments_status}
----
-"""
-    return frontmatter
+    comments_status = "true" if context.comments_open(pub_date) else "false"
+    
+    return (f"---\nlayout: post\ntitle: {yaml_quoted(title)}\ndate: {yaml_date(pub_date)}\n"
+            f"categories: {yaml_terms(categories)}\ntags: {yaml_terms(tags)}\nimage: {yaml_scalar(image)}\n"
+            f"permalink: {yaml_permalink(slug)}\ncustom_excerpt: {yaml_quoted(excerpt)}\n"
+            f"comments: {comments_status}\n---\n")
 
 
 def format_markdown_file(frontmatter, content):
@@ -148,75 +1094,1458 @@ def format_markdown_file(frontmatter, content):
     return md_content
 
 
+def markdown_fragments(frontmatter, content_fragments):
+    """
+    Lays out frontmatter and content fragments as a complete Markdown file,
+    the same text format_markdown_file builds, without joining them.
+    """
+    return [frontmatter, "\n", *content_fragments, "\n"]
+
+
+def iter_text(fragments):
+    """
+    Yields the text of a string or a list of fragments piece by piece.
+    Fragments are strings or (text, start, end) ranges of a string; long
+    ones are sliced into MARKDOWN_WRITE_CHUNK pieces, so writing a post
+    never needs a second full copy of its body.
+    """
+    if isinstance(fragments, str):
+        fragments = (fragments,)
+    for fragment in fragments:
+        if isinstance(fragment, str):
+            if len(fragment) <= MARKDOWN_WRITE_CHUNK:
+                yield fragment
+                continue
+            text, start, end = fragment, 0, len(fragment)
+        else:
+            text, start, end = fragment
+        for offset in range(start, end, MARKDOWN_WRITE_CHUNK):
+            yield text[offset:min(offset + MARKDOWN_WRITE_CHUNK, end)]
+
+
+def join_fragments(fragments):
+    """
+    Returns the text of a list of fragments as a single string.
+    """
+    return "".join(fragment if isinstance(fragment, str) else fragment[0][fragment[1]:fragment[2]]
+                   for fragment in fragments)
+
+
+def fragments_length(fragments):
+    """
+    Returns the number of characters in a string or a list of fragments.
+    """
+    if isinstance(fragments, str):
+        return len(fragments)
+    return sum(len(fragment) if isinstance(fragment, str) else fragment[2] - fragment[1] for fragment in fragments)
+
+
 def write_markdown_file(output_folder, filename, content):
     """
     Takes filename and content, writes to disk.
     Creates the file in the specified output folder.
+    The content is a string or a list of fragments from markdown_fragments.
     """
     filepath = os.path.join(output_folder, filename)
     try:
         with open(filepath, "w", encoding="utf-8") as md_file:
-            md_file.write(content)
+            md_file.writelines(iter_text(content))
         return True
     except IOError as e:
         print(f"Error writing file '{filepath}': {e}")
         return False
 
 
-def prepare_output_folder(output_folder):
+def discard_partial_file(md_file, filepath):
+    """
+    Closes and removes a file whose write failed part of the way through.
+    """
+    try:
+        md_file.close()
+    except OSError:
+        pass
+    try:
+        os.remove(filepath)
+    except OSError:
+        pass
+
+
+class BufferedMarkdownWriter:
+    """
+    Writes Markdown files from a bounded queue with a pool of threads.
+    Each thread takes up to batch_size queued files at a time, so slow
+    open/close calls on network filesystems overlap with each other and
+    with post conversion. The fsync policy decides how durable each file
+    is once it has been written.
+    """
+
+    def __init__(self, output_folder, threads=4, queue_size=1024, batch_size=64, fsync="none"):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync policy must be one of {', '.join(FSYNC_POLICIES)}")
+        self.output_folder = output_folder
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.files_written = 0
+        self.bytes_written = 0
+        self.failed = []
+        self.latencies = []
+        self.elapsed = 0.0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._threads = [threading.Thread(target=self._drain, daemon=True) for _ in range(threads)]
+        for thread in self._threads:
+            thread.start()
+
+    def write(self, filename, content):
+        """
+        Queues a file to be written, blocking while the queue is full.
+        Returns True once the file is queued; failures are in self.failed.
+        """
+        self._queue.put((filename, content))
+        return True
+
+    def flush(self):
+        """
+        Waits until every file queued so far has been written.
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        Waits for every queued file to be written and stops the threads.
+        """
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - self._started
+
+    def _drain(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._write_batch(batch)
+                    for _ in range(len(batch) + 1):
+                        self._queue.task_done()
+                    return
+                batch.append(item)
+            self._write_batch(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write_batch(self, batch):
+        open_files = []
+        for filename, content in batch:
+            filepath = os.path.join(self.output_folder, filename)
+            start = time.perf_counter()
+            try:
+                size = 0
+                md_file = open(filepath, "wb")
+                try:
+                    for piece in iter_text(content):
+                        data = piece.encode("utf-8")
+                        md_file.write(data)
+                        size += len(data)
+                    if self.fsync == "file":
+                        md_file.flush()
+                        os.fsync(md_file.fileno())
+                except OSError:
+                    discard_partial_file(md_file, filepath)
+                    raise
+                if self.fsync == "batch":
+                    open_files.append((filename, md_file, start, size))
+                else:
+                    md_file.close()
+                    self._record(start, size)
+            except OSError as e:
+                print(f"Error writing file '{filepath}': {e}")
+                with self._lock:
+                    self.failed.append(filename)
+        
+        # With the batch policy every file in the batch is synced together
+        for filename, md_file, start, size in open_files:
+            filepath = os.path.join(self.output_folder, filename)
+            try:
+                md_file.flush()
+                os.fsync(md_file.fileno())
+                md_file.close()
+                self._record(start, size)
+            except OSError as e:
+                discard_partial_file(md_file, filepath)
+                print(f"Error writing file '{filepath}': {e}")
+                with self._lock:
+                    self.failed.append(filename)
+
+    def _record(self, start, size):
+        latency = time.perf_counter() - start
+        with self._lock:
+            self.files_written += 1
+            self.bytes_written += size
+            self.latencies.append(latency)
+
+    def summary(self):
+        """
+        Returns a one-line report of bytes written, files/sec and p99 latency.
+        """
+        files_per_sec = self.files_written / self.elapsed if self.elapsed else 0.0
+        p99_ms = 0.0
+        if self.latencies:
+            latencies = sorted(self.latencies)
+            p99_ms = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        return (f"Wrote {self.bytes_written:,} bytes in {self.files_written:,} files "
+                f"({files_per_sec:,.0f} files/sec, p99 write latency {p99_ms:.2f} ms, fsync: {self.fsync}).")
+
+
+class ArchiveWriter:
+    """
+    Streams every post straight into a single .tar, .tar.gz or .zip file.
+    Each post becomes an archive entry named "{date}-{slug}.md", so no
+    per-post files are ever created on disk.
+    """
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self.files_written = 0
+        self.bytes_written = 0
+        self.failed = []
+        self._mtime = time.time()
+        mode = None
+        for extension, archive_mode in ARCHIVE_MODES.items():
+            if archive_path.lower().endswith(extension):
+                mode = archive_mode
+        if mode is None:
+            raise ValueError(f"archive must end with one of {', '.join(ARCHIVE_MODES)}")
+        if mode == "zip":
+            self._zip = zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_DEFLATED)
+            self._tar = None
+        else:
+            self._zip = None
+            self._tar = tarfile.open(archive_path, mode)
+
+    def write(self, filename, content):
+        """
+        Adds one post to the archive.
+        Returns True if the entry was written, False otherwise.
+        """
+        data = b"".join(piece.encode("utf-8") for piece in iter_text(content))
+        try:
+            if self._zip is not None:
+                entry = zipfile.ZipInfo(filename, time.localtime(self._mtime)[:6])
+                entry.compress_type = zipfile.ZIP_DEFLATED
+                self._zip.writestr(entry, data)
+            else:
+                entry = tarfile.TarInfo(filename)
+                entry.size = len(data)
+                entry.mtime = self._mtime
+                entry.mode = 0o644
+                self._tar.addfile(entry, io.BytesIO(data))
+        except OSError as e:
+            print(f"Error writing '{filename}' to archive '{self.archive_path}': {e}")
+            self.failed.append(filename)
+            return False
+        self.files_written += 1
+        self.bytes_written += len(data)
+        return True
+
+    def close(self):
+        """
+        Finishes and closes the archive file.
+        """
+        if self._zip is not None:
+            self._zip.close()
+        else:
+            self._tar.close()
+
+    def summary(self):
+        """
+        Returns a one-line report of what was added to the archive.
+        """
+        return f"Wrote {self.bytes_written:,} bytes in {self.files_written:,} entries to '{self.archive_path}'."
+
+
+def file_digest(path):
+    """
+    Returns the SHA-256 hex digest of a file, read in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(ASSET_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AssetCopier:
+    """
+    Copies the images posts refer to from a local mirror of the WordPress
+    media library into the Jekyll assets folder.
+    Each referenced file is copied once on a pool of threads. Files with
+    the same contents are stored once and hard-linked under their other
+    names, and files already in place with the same contents are skipped.
+    If the copy of the first file with some contents fails, its duplicates
+    are copied from the mirror instead of linked.
+    """
+
+    def __init__(self, mirror_folder, asset_folder=DEFAULT_ASSET_FOLDER, threads=4):
+        self.mirror_folder = mirror_folder
+        self.asset_folder = asset_folder
+        self.copied = 0
+        self.unchanged = 0
+        self.linked = 0
+        self.missing = []
+        self._seen = set()
+        self._originals = {}
+        self._failed = set()
+        self._duplicates = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=threads)
+        self._futures = []
+
+    def collect_rows(self, rows):
+        """
+        Passes rows through, queueing a copy of every image each row refers to.
+        """
+        for row in rows:
+            for column in ("Image Path", "Content"):
+                value = row.get(column)
+                if value and "example.com/images/" in value:
+                    for path in IMAGE_URL_PATTERN.findall(value):
+                        self.add(path)
+            yield row
+
+    def add(self, path):
+        """
+        Queues one image, given by its path under the images URL, for copying.
+        """
+        if path in self._seen:
+            return
+        self._seen.add(path)
+        parts = path.split("/")
+        if ".." in parts or "" in parts:
+            self.missing.append(path)
+            return
+        self._futures.append(self._executor.submit(self._copy, path))
+
+    def _copy(self, path):
+        source = os.path.join(self.mirror_folder, *path.split("/"))
+        target = os.path.join(self.asset_folder, *path.split("/"))
+        try:
+            digest = file_digest(source)
+        except OSError:
+            with self._lock:
+                self.missing.append(path)
+            return
+        with self._lock:
+            original = self._originals.setdefault(digest, target)
+            if original != target:
+                self._duplicates.append((path, source, original, target))
+                return
+        try:
+            if os.path.exists(target) and file_digest(target) == digest:
+                with self._lock:
+                    self.unchanged += 1
+                return
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(source, target)
+        except OSError as e:
+            print(f"Error copying image '{source}' to '{target}': {e}")
+            with self._lock:
+                self.missing.append(path)
+                self._failed.add(target)
+            return
+        with self._lock:
+            self.copied += 1
+
+    def close(self):
+        """
+        Waits for every copy to finish, then links the duplicate images.
+        A duplicate of a file that could not be copied is copied from the
+        mirror itself and stands in as the original for the rest.
+        """
+        self._executor.shutdown(wait=True)
+        replacements = {}
+        for path, source, original, target in self._duplicates:
+            original = replacements.get(original, original)
+            if original in self._failed:
+                try:
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.copyfile(source, target)
+                except OSError as e:
+                    print(f"Error copying image '{source}' to '{target}': {e}")
+                    self.missing.append(path)
+                    continue
+                self.copied += 1
+                replacements[original] = target
+                continue
+            try:
+                if os.path.exists(target):
+                    if os.path.samefile(original, target):
+                        self.linked += 1
+                        continue
+                    os.remove(target)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                try:
+                    os.link(original, target)
+                except OSError:
+                    shutil.copyfile(original, target)
+            except OSError as e:
+                print(f"Error linking image '{target}' to '{original}': {e}")
+                self.missing.append(path)
+                continue
+            self.linked += 1
+
+    def summary(self):
+        """
+        Returns a one-line description of the images that were copied.
+        """
+        return (f"Copied {self.copied} images to '{self.asset_folder}' "
+                f"({self.linked} duplicates linked, {self.unchanged} unchanged, "
+                f"{len(self.missing)} missing).")
+
+
+def prepare_output_folder(output_folder, clean=True):
     """
     Prepares the output folder by removing and recreating it.
-    Ensures a clean starting state.
+    Ensures a clean starting state, unless clean is False, in which case
+    existing posts are kept for an incremental run.
     """
-    if os.path.exists(output_folder):
+    if clean and os.path.exists(output_folder):
         shutil.rmtree(output_folder)
     os.makedirs(output_folder, exist_ok=True)
 
 
-def main():
+def staging_folder(output_folder):
+    """
+    Returns the sibling folder a full run builds its posts in.
+    """
+    return os.path.normpath(output_folder) + STAGING_SUFFIX
+
+
+def previous_folder(output_folder):
+    """
+    Returns the sibling folder the previous generation of posts is kept in.
+    """
+    return os.path.normpath(output_folder) + PREVIOUS_SUFFIX
+
+
+def swap_output_folder(build_folder, output_folder):
+    """
+    Moves a finished build into place with renames, so the output folder
+    always holds a complete set of posts. The current posts become the
+    previous generation, and the generation before that is deleted on a
+    background thread. Returns that thread, or None if there was nothing
+    to delete.
+    """
+    previous = previous_folder(output_folder)
+    cleanup = None
+    if os.path.exists(previous):
+        doomed = f"{os.path.normpath(output_folder)}.deleting-{time.time_ns()}"
+        os.rename(previous, doomed)
+        cleanup = threading.Thread(target=shutil.rmtree, args=(doomed,), kwargs={"ignore_errors": True})
+        cleanup.start()
+    if os.path.exists(output_folder):
+        os.rename(output_folder, previous)
+    os.rename(build_folder, output_folder)
+    return cleanup
+
+
+def rollback_output_folder(output_folder):
+    """
+    Swaps the output folder with the previous generation of posts.
+    Returns False if there is no previous generation to roll back to.
+    """
+    previous = previous_folder(output_folder)
+    if not os.path.exists(previous):
+        return False
+    if not os.path.exists(output_folder):
+        os.rename(previous, output_folder)
+        return True
+    swapping = f"{os.path.normpath(output_folder)}.swapping-{time.time_ns()}"
+    os.rename(output_folder, swapping)
+    os.rename(previous, output_folder)
+    os.rename(swapping, previous)
+    return True
+
+
+def hash_row(row, context=None):
+    """
+    Returns a hex digest of every column in a CSV row, together with the
+    run settings that change its post: the post format version, whether
+    the post still takes comments, and whether content becomes Markdown.
+    Two rows have the same hash only if they would produce the same post.
+    """
+    context = context or RunContext()
+    pub_date = get_column(row, "Date", context.default_pub_date)
+    settings = f"{MANIFEST_FORMAT_VERSION}\x1f{context.comments_open(pub_date)}\x1f{context.markdown}\x1e"
+    digest = hashlib.sha256(settings.encode("utf-8"))
+    for key, value in row.items():
+        digest.update(f"{key}\x1f{value}\x1e".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    Remembers which source row each generated post was built from.
+    The manifest maps "{date}-{slug}.md" filenames to the hash of their
+    row, so an incremental run only rewrites new or changed posts and
+    removes the ones that are no longer in the export. Rows are hashed
+    with the run context, so a post is also rewritten when the run would
+    write it differently, e.g. once its comments close.
+    """
+
+    def __init__(self, output_folder, context=None):
+        self.output_folder = output_folder
+        self.context = context or RunContext()
+        self.path = os.path.join(output_folder, MANIFEST_FILENAME)
+        self.previous = self._load()
+        self.current = {}
+        self.unchanged_count = 0
+        self._previous_by_hash = {row_hash: filename for filename, row_hash in self.previous.items()}
+        self._pending_hashes = deque()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as manifest_file:
+                return json.load(manifest_file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def changed_rows(self, rows):
+        """
+        Yields only the rows that are new or changed since the last run.
+        Unchanged rows whose post still exists are recorded and skipped.
+        """
+        for row in rows:
+            row_hash = hash_row(row, self.context)
+            filename = self._previous_by_hash.get(row_hash)
+            if filename and os.path.exists(os.path.join(self.output_folder, filename)):
+                self.current[filename] = row_hash
+                self.unchanged_count += 1
+                continue
+            self._pending_hashes.append(row_hash)
+            yield row
+
+    def record(self, filename, written):
+        """
+        Records the result of a row yielded by changed_rows().
+        Results must be recorded in the same order the rows were yielded.
+        """
+        row_hash = self._pending_hashes.popleft()
+        if written:
+            self.current[filename] = row_hash
+
+    def restore(self, filename, row):
+        """
+        Records a post written by an earlier, interrupted run of this export.
+        Returns True if the post is still in the output folder.
+        """
+        if not os.path.exists(os.path.join(self.output_folder, filename)):
+            return False
+        self.current[filename] = hash_row(row, self.context)
+        return True
+
+    def discard(self, filename):
+        """
+        Forgets a post that turned out not to be written after all.
+        """
+        self.current.pop(filename, None)
+
+    def remove_stale(self):
+        """
+        Deletes posts from the previous run that are not in this export.
+        Returns the number of files removed.
+        """
+        removed_count = 0
+        for filename in self.previous:
+            if filename not in self.current:
+                try:
+                    os.remove(os.path.join(self.output_folder, filename))
+                    removed_count += 1
+                except FileNotFoundError:
+                    pass
+        return removed_count
+
+    def save(self):
+        """
+        Writes the manifest for this run into the output folder.
+        """
+        with open(self.path, "w", encoding="utf-8") as manifest_file:
+            json.dump(self.current, manifest_file, indent=0, sort_keys=True)
+
+
+def row_filename(row, context=None):
+    """
+    Returns the "{date}-{slug}.md" filename a row is written to.
+    """
+    title = get_column(row, "Title", "Untitled")
+    slug = get_column(row, "Slug", lambda: sanitize_slug(title))
+    pub_date = get_column(row, "Date", (context or RunContext()).default_pub_date)
+    return f"{format_post_date(pub_date)}-{slug}.md"
+
+
+class Checkpoint:
+    """
+    Records how far a migration into the output folder has got, so a run
+    that crashed can be resumed with --resume instead of starting over.
+    Every interval posts, once all posts so far are on disk, the number of
+    export rows done is saved together with the size and modification time
+    of the export and the run's reference time. The file is replaced
+    atomically and removed when the run finishes.
+    """
+
+    def __init__(self, output_folder, input_file, interval=CHECKPOINT_INTERVAL):
+        self.path = os.path.join(output_folder, CHECKPOINT_FILENAME)
+        self.input_file = input_file
+        self.interval = interval
+        self.rows_done = 0
+        self.processed_count = 0
+        self.as_of = None
+
+    def _input_state(self):
+        stat = os.stat(self.input_file)
+        return {"input": os.path.abspath(self.input_file), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def load(self):
+        """
+        Reads the checkpoint left by an interrupted run.
+        Returns True if it exists and was made from the same export file.
+        """
+        try:
+            with open(self.path, "r", encoding="utf-8") as checkpoint_file:
+                state = json.load(checkpoint_file)
+            input_state = self._input_state()
+        except (OSError, ValueError):
+            return False
+        if any(state.get(key) != value for key, value in input_state.items()):
+            print(f"Warning: the checkpoint in '{self.path}' was made from a different export; starting over.")
+            return False
+        self.rows_done = state["rows"]
+        self.processed_count = state["processed"]
+        self.as_of = datetime.fromisoformat(state["as_of"])
+        return True
+
+    def skip_rows(self, rows, manifest=None):
+        """
+        Passes rows through, skipping the ones the interrupted run finished.
+        Skipped posts that are still on disk are restored into the manifest.
+        """
+        context = RunContext(self.as_of)
+        for index, row in enumerate(rows):
+            if index >= self.rows_done:
+                yield row
+            elif manifest is not None:
+                manifest.restore(row_filename(row, context), row)
+
+    def update(self, rows_done, processed_count, context, writer=None):
+        """
+        Saves a checkpoint every interval rows, after flushing the writer.
+        """
+        if not self.interval or rows_done % self.interval:
+            return
+        if writer is not None:
+            writer.flush()
+        self.save(rows_done, processed_count, context)
+
+    def save(self, rows_done, processed_count, context):
+        """
+        Atomically replaces the checkpoint file with the given progress.
+        """
+        state = dict(self._input_state(), rows=rows_done, processed=processed_count,
+                     as_of=context.as_of.isoformat())
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as checkpoint_file:
+            json.dump(state, checkpoint_file)
+        os.replace(temp_path, self.path)
+
+    def remove(self):
+        """
+        Deletes the checkpoint once the run has finished.
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def hash_key(*parts):
+    """
+    Returns a 64-bit integer hash of a tuple of strings.
+    Used to index keys in bounded memory without keeping the strings.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")
+    return int.from_bytes(digest.digest(), "big")
+
+
+class SlugIndex:
+    """
+    Detects posts that would share a filename or permalink.
+    Every (date, slug) pair and every permalink slug seen so far is kept
+    as a 64-bit hash, so each check is O(1) and a million posts take tens
+    of megabytes rather than the full strings. A post whose slug is taken
+    gets the first free "-2", "-3", ... suffix, which is deterministic for
+    a given export order.
+    """
+
+    def __init__(self, context=None):
+        self.context = context or RunContext()
+        self.collision_count = 0
+        self.same_date_count = 0
+        self.examples = []
+        self._file_keys = set()
+        self._permalinks = set()
+        self._next_suffix = {}
+
+    def resolve_rows(self, rows):
+        """
+        Yields every row, with a suffixed Slug when its slug is taken.
+        """
+        for row in rows:
+            title = get_column(row, "Title", "Untitled")
+            slug = get_column(row, "Slug", lambda: sanitize_slug(title))
+            pub_date = get_column(row, "Date", self.context.default_pub_date)
+            new_slug = self.resolve(format_post_date(pub_date), slug)
+            if new_slug != slug:
+                row = with_column(row, "Slug", new_slug)
+            yield row
+
+    def resolve(self, date, slug):
+        """
+        Registers a post and returns the slug it should be written with.
+        """
+        permalink_key = hash_key(slug)
+        if permalink_key not in self._permalinks:
+            self._permalinks.add(permalink_key)
+            self._file_keys.add(hash_key(date, slug))
+            return slug
+        
+        # The permalink is taken; find the next free suffix for this slug
+        self.collision_count += 1
+        if hash_key(date, slug) in self._file_keys:
+            self.same_date_count += 1
+        suffix = self._next_suffix.get(permalink_key, 2)
+        while hash_key(f"{slug}-{suffix}") in self._permalinks:
+            suffix += 1
+        self._next_suffix[permalink_key] = suffix + 1
+        new_slug = f"{slug}-{suffix}"
+        self._permalinks.add(hash_key(new_slug))
+        self._file_keys.add(hash_key(date, new_slug))
+        if len(self.examples) < COLLISION_REPORT_LIMIT:
+            self.examples.append((date, slug, new_slug))
+        return new_slug
+
+    def report(self):
+        """
+        Returns a printable summary of the collisions that were resolved.
+        """
+        lines = [f"Resolved {self.collision_count} slug collisions "
+                 f"({self.same_date_count} would have overwritten a file with the same date):"]
+        for date, slug, new_slug in self.examples:
+            lines.append(f"  {date} {slug} -> {new_slug}")
+        if self.collision_count > len(self.examples):
+            lines.append(f"  ... and {self.collision_count - len(self.examples)} more")
+        return "\n".join(lines)
+
+
+@lru_cache(maxsize=TERM_CACHE_SIZE)
+def split_terms(value):
+    """
+    Splits a comma-separated Categories or Tags value into its terms.
+    Returns a tuple of the distinct, non-empty terms in their original order.
+    """
+    return tuple(dict.fromkeys(term.strip() for term in value.split(",") if term.strip()))
+
+
+class TaxonomyIndex:
+    """
+    Builds an inverted index from each category and tag to its posts while
+    the rows stream past, then writes the Jekyll archive pages from it.
+    Every post is stored once, as its date, title and slug, and each term
+    keeps an array of 4-byte post numbers, so a million posts fit in a
+    compact index and the export never has to be read a second time.
+    """
+
+    def __init__(self, context=None):
+        self.context = context or RunContext()
+        self.dates = []
+        self.titles = []
+        self.slugs = []
+        self.terms = {"categories": {}, "tags": {}}
+
+    def collect_rows(self, rows):
+        """
+        Passes rows through, adding each one to the index.
+        """
+        for row in rows:
+            self.add(row)
+            yield row
+
+    def add(self, row):
+        """
+        Adds one export row to the index.
+        """
+        post = len(self.titles)
+        title = get_column(row, "Title", "Untitled")
+        self.titles.append(title)
+        self.slugs.append(get_column(row, "Slug", lambda: sanitize_slug(title)))
+        self.dates.append(format_post_date(get_column(row, "Date", self.context.default_pub_date)))
+        for kind, column, default in (("categories", "Categories", "Uncategorized"), ("tags", "Tags", "")):
+            index = self.terms[kind]
+            for term in split_terms(get_column(row, column, default)):
+                postings = index.get(term)
+                if postings is None:
+                    postings = index[term] = array("I")
+                postings.append(post)
+
+    def write(self, site_folder):
+        """
+        Writes an archive page for every category and tag, plus
+        _data/categories.json and _data/tags.json, under site_folder.
+        Pages an earlier run generated for terms that are gone are removed;
+        they are found through the earlier run's data file, so pages the
+        site keeps in the same folders are left alone.
+        Returns a dictionary of the number of pages written of each kind.
+        """
+        page_counts = {}
+        data_folder = os.path.join(site_folder, "_data")
+        os.makedirs(data_folder, exist_ok=True)
+        for kind, folder in TAXONOMY_FOLDERS.items():
+            page_folder = os.path.join(site_folder, folder)
+            os.makedirs(page_folder, exist_ok=True)
+            data_path = os.path.join(data_folder, f"{kind}.json")
+            previous_slugs = self._generated_slugs(data_path)
+            data = {}
+            used_slugs = set()
+            for term in sorted(self.terms[kind]):
+                base_slug = sanitize_slug(term) or "term"
+                slug = base_slug
+                suffix = 2
+                while slug in used_slugs:
+                    slug = f"{base_slug}-{suffix}"
+                    suffix += 1
+                used_slugs.add(slug)
+                url = f"/{folder}/{slug}/"
+                postings = self.terms[kind][term]
+                self._write_page(os.path.join(page_folder, f"{slug}.md"), kind, term, url, postings)
+                data[term] = {"slug": slug, "url": url, "count": len(postings)}
+            for slug in previous_slugs - used_slugs:
+                try:
+                    os.remove(os.path.join(page_folder, f"{slug}.md"))
+                except FileNotFoundError:
+                    pass
+            with open(data_path, "w", encoding="utf-8") as json_file:
+                json.dump(data, json_file, ensure_ascii=False, indent=2, sort_keys=True)
+            page_counts[kind] = len(data)
+        return page_counts
+
+    def _generated_slugs(self, data_path):
+        try:
+            with open(data_path, "r", encoding="utf-8") as json_file:
+                data = json.load(json_file)
+            return {entry["slug"] for entry in data.values()}
+        except (FileNotFoundError, ValueError, AttributeError, KeyError, TypeError):
+            return set()
+
+    def _write_page(self, path, kind, term, url, postings):
+        dates, titles, slugs = self.dates, self.titles, self.slugs
+        layout = "category" if kind == "categories" else "tag"
+        # Newest posts first; Python's sort is stable, so ties keep export order
+        posts = sorted(postings, key=dates.__getitem__, reverse=True)
+        with open(path, "w", encoding="utf-8") as page_file:
+            page_file.write(f"---\nlayout: {layout}\ntitle: {yaml_quoted(term)}\n"
+                            f"{layout}: {yaml_quoted(term)}\npermalink: {url}\n---\n")
+            page_file.writelines(
+                f"- [{titles[post].translate(LINK_TEXT_TABLE)}](/{slugs[post]}/) ({dates[post]})\n"
+                for post in posts
+            )
+
+
+def convert_post_fragments(row, fallback_counts=None, context=None):
+    """
+    Runs a single CSV row through the whole conversion pipeline.
+    Returns a tuple of (filename, markdown fragments) ready to be written;
+    the post body is referenced, not copied, until it is written.
+    """
+    # Process post row
+    post_data = process_post_row(row, fallback_counts, context)
+    
+    # Convert HTML content to Markdown
+    content_text = convert_content(post_data.content, context)
+    
+    # Add dropcaps to content
+    content_fragments = dropcaps_fragments(content_text)
+    
+    # Generate frontmatter
+    frontmatter = generate_frontmatter(post_data, context)
+    
+    # Format complete markdown file
+    md_fragments = markdown_fragments(frontmatter, content_fragments)
+    
+    # Generate filename
+    filename = f"{post_data.date}-{post_data.slug}.md"
+    
+    return filename, md_fragments
+
+
+def convert_post(row, fallback_counts=None, context=None):
+    """
+    Runs a single CSV row through the whole conversion pipeline.
+    Returns a tuple of (filename, markdown content) ready to be written.
+    """
+    filename, md_fragments = convert_post_fragments(row, fallback_counts, context)
+    return filename, join_fragments(md_fragments)
+
+
+class StageTimer:
+    """
+    Collects a high-resolution timing for every post in each pipeline stage.
+    Timings are kept in compact arrays of seconds so that per-stage
+    percentiles can be reported at the end of the run.
+    """
+
+    def __init__(self):
+        self.timings = {stage: array("d") for stage in PIPELINE_STAGES}
+
+    def add(self, stage, seconds):
+        """
+        Records how long one post spent in a stage.
+        """
+        self.timings[stage].append(seconds)
+
+    def timed_rows(self, rows):
+        """
+        Yields rows from an iterable, timing each one under the read stage.
+        """
+        rows = iter(rows)
+        while True:
+            start = time.perf_counter()
+            try:
+                row = next(rows)
+            except StopIteration:
+                return
+            self.add("read", time.perf_counter() - start)
+            yield row
+
+    def stats(self):
+        """
+        Returns a dictionary of count, total, mean, p50, p95 and p99 (in
+        seconds) for each stage that recorded at least one post.
+        """
+        stats = {}
+        for stage, timings in self.timings.items():
+            if not timings:
+                continue
+            ordered = sorted(timings)
+            count = len(ordered)
+            total = sum(ordered)
+            stats[stage] = {
+                "count": count,
+                "total": total,
+                "mean": total / count,
+                "p50": ordered[min(count - 1, int(count * 0.50))],
+                "p95": ordered[min(count - 1, int(count * 0.95))],
+                "p99": ordered[min(count - 1, int(count * 0.99))],
+            }
+        return stats
+
+    def report(self):
+        """
+        Returns the per-stage timings as a printable table.
+        """
+        lines = [f"{'Stage':<12} {'Total (s)':>10} {'Mean (ms)':>10} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10}"]
+        for stage, stage_stats in self.stats().items():
+            lines.append(f"{stage:<12} {stage_stats['total']:>10.3f} {stage_stats['mean'] * 1000:>10.4f} "
+                         f"{stage_stats['p50'] * 1000:>10.4f} {stage_stats['p95'] * 1000:>10.4f} "
+                         f"{stage_stats['p99'] * 1000:>10.4f}")
+        return "\n".join(lines)
+
+
+def convert_post_timed(row, timer, fallback_counts=None, context=None):
+    """
+    Runs a single CSV row through the pipeline like convert_post_fragments,
+    timing each stage with the given StageTimer.
+    Returns a tuple of (filename, markdown fragments) ready to be written.
+    """
+    clock = time.perf_counter
+    start = clock()
+    post_data = process_post_row(row, fallback_counts, context)
+    process_end = clock()
+    content_text = convert_content(post_data.content, context)
+    markdown_end = clock()
+    content_fragments = dropcaps_fragments(content_text)
+    dropcaps_end = clock()
+    frontmatter = generate_frontmatter(post_data, context)
+    frontmatter_end = clock()
+    md_fragments = markdown_fragments(frontmatter, content_fragments)
+    filename = f"{post_data.date}-{post_data.slug}.md"
+    format_end = clock()
+    
+    timer.add("process", process_end - start)
+    timer.add("markdown", markdown_end - process_end)
+    timer.add("dropcaps", dropcaps_end - markdown_end)
+    timer.add("frontmatter", frontmatter_end - dropcaps_end)
+    timer.add("format", format_end - frontmatter_end)
+    return filename, md_fragments
+
+
+class DryRunWriter:
+    """
+    Stands in for the output when nothing should be written to disk.
+    Posts are fully converted and counted, then discarded, so a dry run
+    measures the CPU cost of a migration without its I/O.
+    """
+
+    def __init__(self):
+        self.files_written = 0
+        self.bytes_written = 0
+        self.failed = []
+
+    def write(self, filename, content):
+        """
+        Counts a post without writing it. Always returns True.
+        """
+        self.files_written += 1
+        self.bytes_written += fragments_length(content)
+        return True
+
+    def close(self):
+        """
+        Nothing to close for a dry run.
+        """
+
+    def summary(self):
+        """
+        Returns a one-line report of what would have been written.
+        """
+        return f"Converted {self.files_written:,} posts ({self.bytes_written:,} characters) without writing them."
+
+
+def convert_chunk(rows, context=None):
+    """
+    Converts a chunk of rows in a worker process without writing them.
+    Returns a list of (filename, markdown fragments) tuples in the same order
+    as rows, and a Counter of the column defaults that were used.
+    """
+    fallback_counts = Counter()
+    converted = [convert_post_fragments(row, fallback_counts, context) for row in rows]
+    return converted, fallback_counts
+
+
+def migrate_chunk(rows, output_folder, context=None):
+    """
+    Converts and writes a chunk of rows in a worker process.
+    Returns a list of (filename, written) tuples in the same order as rows,
+    and a Counter of the column defaults that were used.
+    """
+    results = []
+    fallback_counts = Counter()
+    for row in rows:
+        filename, md_content = convert_post_fragments(row, fallback_counts, context)
+        results.append((filename, write_markdown_file(output_folder, filename, md_content)))
+    return results, fallback_counts
+
+
+def iter_chunks(rows, chunk_size):
+    """
+    Groups an iterable of rows into lists of at most chunk_size rows.
+    Yields each chunk as soon as it is full.
+    """
+    rows = iter(rows)
+    chunk = list(islice(rows, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(rows, chunk_size))
+
+
+def migrate_rows(rows, output_folder, workers=1, chunk_size=DEFAULT_CHUNK_SIZE, fallback_counts=None,
+                 writer=None, context=None, timer=None):
+    """
+    Converts and writes every row, optionally across a pool of processes.
+    Yields (filename, written) tuples in input order, so the results are
+    the same no matter how many workers are used. Column defaults that
+    were used are added to fallback_counts when a Counter is given.
+    When a writer is given, posts are handed to writer.write() instead of
+    being written directly. When a StageTimer is given, every stage is
+    timed; this is only supported with a single worker.
+    """
+    if context is None:
+        context = RunContext()
+    
+    if timer is not None:
+        for row in rows:
+            filename, md_content = convert_post_timed(row, timer, fallback_counts, context)
+            start = time.perf_counter()
+            if writer is None:
+                written = write_markdown_file(output_folder, filename, md_content)
+            else:
+                written = writer.write(filename, md_content)
+            timer.add("write", time.perf_counter() - start)
+            yield filename, written
+        return
+    
+    if workers <= 1:
+        for row in rows:
+            filename, md_content = convert_post_fragments(row, fallback_counts, context)
+            if writer is None:
+                yield filename, write_markdown_file(output_folder, filename, md_content)
+            else:
+                yield filename, writer.write(filename, md_content)
+        return
+    
+    def collect(future):
+        results, chunk_counts = future.result()
+        if fallback_counts is not None:
+            fallback_counts.update(chunk_counts)
+        if writer is None:
+            return results
+        return [(filename, writer.write(filename, md_content)) for filename, md_content in results]
+    
+    # Keep only a few chunks in flight so the reader is not drained into memory
+    max_pending = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in iter_chunks(rows, chunk_size):
+            if writer is None:
+                pending.append(executor.submit(migrate_chunk, chunk, output_folder, context))
+            else:
+                pending.append(executor.submit(convert_chunk, chunk, context))
+            if len(pending) >= max_pending:
+                yield from collect(pending.popleft())
+        while pending:
+            yield from collect(pending.popleft())
+
+
+async def migrate_rows_async(rows, output_folder, concurrency=DEFAULT_ASYNC_POSTS, workers=1, fallback_counts=None,
+                             writer=None, context=None):
+    """
+    Converts and writes every row from an asyncio event loop, keeping up
+    to concurrency posts in flight at once.
+    Rows are pulled from the reader on a thread pool, converted on a
+    dedicated thread (or across worker processes when workers is more
+    than 1), and written to disk on the thread pool, so slow writes
+    overlap with the conversion of the posts behind them. Yields (filename, written) tuples
+    in input order, like migrate_rows.
+    """
+    if context is None:
+        context = RunContext()
+    loop = asyncio.get_running_loop()
+    io_executor = ThreadPoolExecutor(max_workers=concurrency)
+    # A single conversion thread avoids GIL contention with the writer threads
+    if workers > 1:
+        cpu_executor = ProcessPoolExecutor(max_workers=workers)
+    else:
+        cpu_executor = ThreadPoolExecutor(max_workers=1)
+    
+    async def migrate(row):
+        converted, counts = await loop.run_in_executor(cpu_executor, convert_chunk, [row], context)
+        filename, md_content = converted[0]
+        if writer is None:
+            written = await loop.run_in_executor(io_executor, write_markdown_file, output_folder, filename, md_content)
+        else:
+            written = writer.write(filename, md_content)
+        return filename, written, counts
+    
+    async def collect(task):
+        filename, written, counts = await task
+        if fallback_counts is not None:
+            fallback_counts.update(counts)
+        return filename, written
+    
+    rows = iter(rows)
+    pending = deque()
+    try:
+        while True:
+            batch = await loop.run_in_executor(io_executor, list, islice(rows, concurrency))
+            if not batch:
+                break
+            for row in batch:
+                pending.append(asyncio.ensure_future(migrate(row)))
+                if len(pending) >= concurrency:
+                    yield await collect(pending.popleft())
+        while pending:
+            yield await collect(pending.popleft())
+    finally:
+        for task in pending:
+            task.cancel()
+        cpu_executor.shutdown()
+        io_executor.shutdown()
+
+
+def iter_async(results):
+    """
+    Runs an async iterator on a private event loop and yields its items,
+    so synchronous code can consume it with a plain for loop.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(results.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        loop.run_until_complete(results.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def parse_date_argument(value):
+    """
+    Parses a "YYYY-MM-DD" command line date into a datetime.
+    Raises argparse.ArgumentTypeError if the date is not valid.
+    """
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD")
+
+
+def parse_args(argv=None):
+    """
+    Parses the command line options for the migrator.
+    Returns an argparse.Namespace with the chosen settings.
+    """
+    parser = argparse.ArgumentParser(description="Migrate a WordPress CSV export to Jekyll posts.")
+    parser.add_argument("--input", default="sample-data.csv",
+                        help="WordPress export CSV or WXR file (default: sample-data.csv)")
+    parser.add_argument("--format", choices=INPUT_FORMATS,
+                        help="format of the export (default: wxr for .xml and .wxr files, otherwise csv)")
+    parser.add_argument("--output", default="sample-posts",
+                        help="folder to write the Markdown posts to (default: sample-posts)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes to convert posts with (default: 1)")
+    parser.add_argument("--columns",
+                        help="JSON or TOML file mapping column names to the headers of a CSV export")
+    parser.add_argument("--reader-workers", type=int, default=0,
+                        help="parse a CSV export across this many processes (default: 0, parse inline); "
+                             "only faster than parsing inline on machines with spare cores")
+    parser.add_argument("--async-posts", type=int, default=0,
+                        help="convert and write posts from an asyncio driver with this many in flight "
+                             "(default: 0, synchronous)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"rows per worker task in --workers mode (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only rewrite new or changed posts and remove deleted ones")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from the checkpoint in the output folder")
+    parser.add_argument("--rollback", action="store_true",
+                        help="swap --output back to the posts from before the last full run and exit")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_INTERVAL,
+                        help=f"posts written between checkpoints, 0 to disable (default: {CHECKPOINT_INTERVAL})")
+    parser.add_argument("--writer-threads", type=int, default=0,
+                        help="write files from a queue with this many threads (default: 0, write inline)")
+    parser.add_argument("--fsync", choices=FSYNC_POLICIES, default="none",
+                        help="when the writer threads fsync files (default: none)")
+    parser.add_argument("--archive",
+                        help="write every post into this .tar, .tar.gz, .tgz or .zip file instead of --output")
+    parser.add_argument("--markdown", action="store_true",
+                        help="convert the HTML post content to Markdown")
+    parser.add_argument("--asset-mirror",
+                        help="local copy of the WordPress images folder to copy referenced images from")
+    parser.add_argument("--asset-output", default=DEFAULT_ASSET_FOLDER,
+                        help=f"folder to copy images into with --asset-mirror (default: {DEFAULT_ASSET_FOLDER})")
+    parser.add_argument("--asset-threads", type=int, default=4,
+                        help="number of threads to copy images with (default: 4)")
+    parser.add_argument("--index-pages",
+                        help="write category and tag archive pages and _data files into this site folder")
+    parser.add_argument("--as-of", type=parse_date_argument,
+                        help="date (YYYY-MM-DD) to measure post age against for comments (default: now)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="convert every post but do not write anything to disk")
+    parser.add_argument("--profile", action="store_true",
+                        help="time each pipeline stage and print a per-stage table")
+    parser.add_argument("--profile-json",
+                        help="also save the per-stage timings to this JSON file (implies --profile)")
+    parser.add_argument("--cprofile",
+                        help="save cProfile statistics for the run to this file")
+    args = parser.parse_args(argv)
+    try:
+        args.columns = ColumnMapping.load(args.columns) if args.columns else ColumnMapping()
+    except (OSError, ValueError) as e:
+        parser.error(f"--columns: {e}")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    if args.asset_threads < 1:
+        parser.error("--asset-threads must be at least 1")
+    if args.profile_json:
+        args.profile = True
+    if args.profile and args.workers > 1:
+        parser.error("--profile can only be used with a single worker")
+    if args.profile and args.async_posts:
+        parser.error("--profile cannot be used with --async-posts")
+    if args.dry_run and args.incremental:
+        parser.error("--incremental cannot be used with --dry-run")
+    if args.archive and args.incremental:
+        parser.error("--incremental cannot be used with --archive")
+    if args.resume and (args.incremental or args.dry_run or args.archive):
+        parser.error("--resume cannot be used with --incremental, --dry-run or --archive")
+    if args.dry_run and args.asset_mirror:
+        parser.error("--asset-mirror cannot be used with --dry-run")
+    if args.dry_run and args.index_pages:
+        parser.error("--index-pages cannot be used with --dry-run")
+    if args.archive and not args.archive.lower().endswith(tuple(ARCHIVE_MODES)):
+        parser.error(f"--archive must end with one of {', '.join(ARCHIVE_MODES)}")
+    return args
+
+
+def main(argv=None):
     """
     Main function that orchestrates the WordPress to Jekyll migration.
-    Reads posts from CSV, processes them, and writes Markdown files.
+    Streams posts from the CSV or WXR export, converting and writing each
+    one as soon as it is read, on one core or across --workers processes.
     """
     # Configuration
-    csv_file = "sample-data.csv"
-    output_folder = "sample-posts"
+    args = parse_args(argv)
+    input_file = args.input
+    output_folder = args.output
+    if args.rollback:
+        if rollback_output_folder(output_folder):
+            print(f"Rolled '{output_folder}' back to the previous generation of posts.")
+        else:
+            print(f"Error: there is no previous generation of '{output_folder}' to roll back to.")
+        return
     
-    # Prepare output folder
-    prepare_output_folder(output_folder)
+    # A full run is built next to the output folder and swapped in at the end,
+    # so the live site never sees a partial set of posts
+    build_folder = output_folder if args.incremental else staging_folder(output_folder)
     
-    # Read CSV file
-    posts = read_csv_file(csv_file)
+    # A resumed run carries on with the interrupted run's reference time
+    checkpoint = None
+    resumed = False
+    if not args.dry_run and not args.archive:
+        checkpoint = Checkpoint(build_folder, input_file, args.checkpoint_every)
+        if args.resume:
+            resumed = checkpoint.load()
+            if not resumed:
+                print(f"No checkpoint to resume from in '{build_folder}'; starting from the beginning.")
+    as_of = args.as_of or (checkpoint.as_of if resumed else None)
+    context = RunContext(as_of, markdown=args.markdown)
     
-    if not posts:
-        print("No posts found.")
-        return
+    timer = StageTimer() if args.profile else None
+    profiler = cProfile.Profile() if args.cprofile else None
     
-    # Process each post
+    # Choose where the posts go: nowhere, an archive, or the output folder
+    manifest = None
+    writer = None
+    rows = read_posts(input_file, args.format, args.reader_workers, args.columns)
+    if timer is not None:
+        rows = timer.timed_rows(rows)
+    slug_index = SlugIndex(context)
+    rows = slug_index.resolve_rows(rows)
+    taxonomy = None
+    if args.index_pages:
+        taxonomy = TaxonomyIndex(context)
+        rows = taxonomy.collect_rows(rows)
+    if args.dry_run:
+        writer = DryRunWriter()
+    elif args.archive:
+        writer = ArchiveWriter(args.archive)
+    else:
+        prepare_output_folder(build_folder, clean=not (args.incremental or resumed))
+        manifest = Manifest(build_folder, context)
+        if resumed:
+            rows = checkpoint.skip_rows(rows, manifest)
+        rows = manifest.changed_rows(rows)
+        if args.writer_threads > 0:
+            writer = BufferedMarkdownWriter(build_folder, threads=args.writer_threads, fsync=args.fsync)
+    assets = None
+    if args.asset_mirror:
+        assets = AssetCopier(args.asset_mirror, args.asset_output, args.asset_threads)
+        rows = assets.collect_rows(rows)
+    
+    # Process each post as it is read from the CSV file
+    post_count = 0
     processed_count = 0
-    for row in posts:
-        # Process post row
-        post_data = process_post_row(row)
-        
-        # Add dropcaps to content
-        content_with_dropcaps = add_dropcaps(post_data["content"])
-        
-        # Generate frontmatter
-        frontmatter = generate_frontmatter(post_data)
-        
-        # Format complete markdown file
-        md_content = format_markdown_file(frontmatter, content_with_dropcaps)
-        
-        # Generate filename
-        filename = f"{post_data['date']}-{post_data['slug']}.md"
-        
-        # Write markdown file
-        if write_markdown_file(output_folder, filename, md_content):
+    skipped_count = checkpoint.rows_done if resumed else 0
+    fallback_counts = Counter()
+    if args.async_posts > 0:
+        results = iter_async(migrate_rows_async(rows, build_folder, args.async_posts, args.workers, fallback_counts,
+                                                writer, context))
+    else:
+        results = migrate_rows(rows, build_folder, args.workers, args.chunk_size, fallback_counts, writer, context,
+                               timer)
+    if profiler is not None:
+        profiler.enable()
+    for filename, written in results:
+        if manifest is not None:
+            manifest.record(filename, written)
+        post_count += 1
+        if written:
             processed_count += 1
+        if checkpoint is not None:
+            checkpoint.update(skipped_count + post_count, checkpoint.processed_count + processed_count, context,
+                              writer)
+    if writer is not None:
+        writer.close()
+        if isinstance(writer, BufferedMarkdownWriter):
+            for filename in writer.failed:
+                manifest.discard(filename)
+            processed_count -= len(writer.failed)
+    if assets is not None:
+        assets.close()
+    page_counts = taxonomy.write(args.index_pages) if taxonomy is not None else None
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.cprofile)
+    unchanged_count = removed_count = 0
+    if manifest is not None:
+        unchanged_count = manifest.unchanged_count
+        removed_count = manifest.remove_stale()
+        manifest.save()
+    if checkpoint is not None:
+        checkpoint.remove()
+        if build_folder != output_folder:
+            swap_output_folder(build_folder, output_folder)
+    
+    if post_count + unchanged_count + skipped_count == 0:
+        print("No posts found.")
+        return
     
-    # Report results
+    # Report results, counting the posts the interrupted run wrote
+    if resumed:
+        processed_count += checkpoint.processed_count
     print(f"Successfully processed {processed_count} posts.")
-    print(f"Markdown files have been created in the '{output_folder}' folder.")
+    if resumed:
+        print(f"Resumed after {skipped_count} posts finished by the interrupted run.")
+    if args.incremental:
+        print(f"Skipped {unchanged_count} unchanged posts and removed {removed_count} deleted posts.")
+    if slug_index.collision_count:
+        print(slug_index.report())
+    if fallback_counts:
+        fallbacks = ", ".join(f"{column}: {count}" for column, count in sorted(fallback_counts.items()))
+        print(f"Default values used for missing columns: {fallbacks}")
+    if writer is not None:
+        print(writer.summary())
+    if page_counts is not None:
+        print(f"Wrote {page_counts['categories']} category pages and {page_counts['tags']} tag pages "
+              f"to '{args.index_pages}'.")
+    if assets is not None:
+        print(assets.summary())
+        if assets.missing:
+            missing = sorted(assets.missing)[:COLLISION_REPORT_LIMIT]
+            print(f"Images not found in '{args.asset_mirror}': {', '.join(missing)}")
+    if timer is not None:
+        print(timer.report())
+        if args.profile_json:
+            with open(args.profile_json, "w", encoding="utf-8") as json_file:
+                json.dump(timer.stats(), json_file, indent=2)
+    if args.dry_run:
+        print("Dry run: no Markdown files were written.")
+    elif args.archive:
+        print(f"Markdown files have been added to the '{args.archive}' archive.")
+    else:
+        print(f"Markdown files have been created in the '{output_folder}' folder.")
 
 
 if __name__ == "__main__":